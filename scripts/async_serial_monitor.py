@@ -12,7 +12,9 @@ Date: 2025-07-13
 """
 
 import asyncio
+import io
 import logging
+import selectors
 import threading
 import time
 from typing import Callable, Optional, Any
@@ -57,6 +59,13 @@ class AsyncSerialMonitor:
     DEFAULT_PARITY = 'N'
     DEFAULT_STOPBITS = 1
     
+    # A frame is read as soon as its first bytes arrive and then for as long
+    # as more bytes follow within READ_GAP_TIMEOUT (a few byte times at
+    # 38400 baud), so each data callback receives whole packets.
+    # READ_MAX_TIME bounds one read on a continuously busy port.
+    READ_GAP_TIMEOUT = 0.002
+    READ_MAX_TIME = 0.1
+    
     def __init__(
         self,
         port: str = DEFAULT_PORT,
@@ -134,6 +143,10 @@ class AsyncSerialMonitor:
         """
         Set callback function for received data
         
+        The callback runs on a worker thread after the reader has moved on, so
+        each call receives its own bytes object rather than a view into a
+        reused read buffer; it may keep the data without copying.
+        
         Args:
             callback: Function to call when data is received (data: bytes) -> None
         """
@@ -313,10 +326,56 @@ class AsyncSerialMonitor:
             self._handle_error(SerialWriteError(error_msg))
             return False
 
+    def _open_read_selector(self) -> Optional[selectors.BaseSelector]:
+        """
+        Create a selector that reports when the serial port becomes readable
+        
+        Returns:
+            Selector registered on the port's file descriptor, or None if the
+            port has no pollable descriptor (e.g. on Windows)
+        """
+        try:
+            selector = selectors.DefaultSelector()
+        except OSError:
+            return None
+            
+        try:
+            selector.register(self._serial.fileno(), selectors.EVENT_READ)
+            return selector
+        except (AttributeError, OSError, TypeError, ValueError, io.UnsupportedOperation):
+            selector.close()
+            return None
+
+    def _read_frame(self, selector: Optional[selectors.BaseSelector]) -> bytes:
+        """
+        Read the waiting bytes, continuing while the rest of the frame arrives
+        
+        Args:
+            selector: Read selector on the port, or None to read only what is
+                waiting now
+            
+        Returns:
+            Bytes read, ending at the first READ_GAP_TIMEOUT without new data
+        """
+        data = self._serial.read(self._serial.in_waiting)
+        if selector is None:
+            return data
+            
+        deadline = time.monotonic() + self.READ_MAX_TIME
+        while time.monotonic() < deadline and selector.select(timeout=self.READ_GAP_TIMEOUT):
+            waiting = self._serial.in_waiting
+            if waiting <= 0:
+                break
+            data += self._serial.read(waiting)
+        return data
+
     def _monitor_loop(self) -> None:
         """Main monitoring loop (runs in separate thread)"""
         self.logger.debug("Monitor loop started")
         
+        # Wait on the port itself where possible instead of sleep-polling
+        selector = self._open_read_selector() if self._serial else None
+        
         while not self._stop_event.is_set() and self._is_monitoring:
             try:
                 if not self._is_connected or not self._serial or not self._serial.is_open:
@@ -325,7 +384,7 @@ class AsyncSerialMonitor:
                     
                 # Check if data is available
                 if self._serial.in_waiting > 0:
-                    data = self._serial.read(self._serial.in_waiting)
+                    data = self._read_frame(selector)
                     if data:
                         self._bytes_received += len(data)
                         self.logger.debug(f"Received {len(data)} bytes")
@@ -334,6 +393,10 @@ class AsyncSerialMonitor:
                         if self._data_callback:
                             self._executor.submit(self._data_callback, data)
                             
+                elif selector is not None:
+                    # Block until data arrives; the timeout bounds how long a
+                    # stop request can go unnoticed
+                    selector.select(timeout=0.1)
                 else:
                     # Small sleep to prevent CPU spinning
                     time.sleep(0.01)
@@ -349,6 +412,9 @@ class AsyncSerialMonitor:
                 self._handle_error(AsyncSerialMonitorError(error_msg))
                 break
                 
+        if selector is not None:
+            selector.close()
+            
         self.logger.debug("Monitor loop ended")
 
     def _send_loop(self) -> None:
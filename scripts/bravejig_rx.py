@@ -0,0 +1,48 @@
+"""
+BraveJIG receive-side packet classification
+
+Shared header reads for the scripts' data callbacks: each callback calls
+classify() first and only runs its detailed parser on the packets it wants.
+"""
+
+import struct
+from typing import Optional, Tuple
+
+# Packet types (byte 1)
+PACKET_TYPE_UPLINK = 0x00
+PACKET_TYPE_DOWNLINK_RESPONSE = 0x01
+
+SENSOR_ID_ILLUMINANCE = 0x0121
+
+_U16 = struct.Struct('<H')
+
+# Sensor ID offset by packet type
+#   Uplink:            Ver, Type, Len(2), UnixTime(4), DeviceID(8), SensorID(2) ...
+#   Downlink response: Ver, Type, UnixTime(4), DeviceID(8), SensorID(2), Order(2) ...
+_SENSOR_ID_OFFSET = {
+    PACKET_TYPE_UPLINK: 16,
+    PACKET_TYPE_DOWNLINK_RESPONSE: 14
+}
+
+
+def classify(data) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Read the routing fields of a received packet
+
+    Args:
+        data: Received packet (bytes, bytearray or memoryview)
+
+    Returns:
+        (packet_type, sensor_id); packet_type is None for packets shorter
+        than 2 bytes, sensor_id is None for packet types without one or when
+        the packet is too short to hold it
+    """
+    if len(data) < 2:
+        return None, None
+
+    packet_type = data[1]
+    offset = _SENSOR_ID_OFFSET.get(packet_type)
+    if offset is None or len(data) < offset + 2:
+        return packet_type, None
+
+    return packet_type, _U16.unpack_from(data, offset)[0]
@@ -13,6 +13,9 @@ import sys
 from datetime import datetime
 from async_serial_monitor import AsyncSerialMonitor
 
+# Signed RSSI byte of the uplink header
+_I8 = struct.Struct('<b')
+
 # Global storage
 downlink_response = None
 parameter_uplink = None
@@ -66,7 +69,7 @@ def parse_parameter_information(data: bytes) -> dict:
         data_length = struct.unpack('<H', data[2:4])[0]
         unix_time = struct.unpack('<L', data[4:8])[0]
         device_id = struct.unpack('<Q', data[8:16])[0]
-        rssi = data[18] if data[18] < 128 else data[18] - 256
+        rssi = _I8.unpack_from(data, 18)[0]
         order = struct.unpack('<H', data[19:21])[0]
         
         # Sensor data starts at index 21
@@ -10,142 +10,214 @@ import time
 import signal
 import struct
 import sys
+import threading
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeoutError
+from typing import Optional
 from async_serial_monitor import AsyncSerialMonitor
+from bravejig_rx import classify, PACKET_TYPE_UPLINK, PACKET_TYPE_DOWNLINK_RESPONSE, SENSOR_ID_ILLUMINANCE
+
+# Downlink request header: version, type, data length, unix time, device ID, sensor ID, CMD, order
+_REQ_HDR = struct.Struct('<BBHLQHBH')
+_UNIX_TIME = struct.Struct('<L')
+# Offset of the request's UnixTime field, patched in by stamp_request
+_UNIX_TIME_OFFSET = 4
+
+# Downlink response: version, type, unix time, device ID, sensor ID, order, CMD, result
+_RESP_HDR = struct.Struct('<BBLQHHBB')
+
+# Result code descriptions, indexed by result code (None = undefined)
+_RESULT_DESC = (
+    "Success",                 # 0x00
+    "Invalid Sensor ID",       # 0x01
+    "Unsupported CMD",         # 0x02
+    "Parameter out of range",  # 0x03
+    "Connection failed",       # 0x04
+    "Timeout",                 # 0x05
+    None,                      # 0x06
+    "Device not found",        # 0x07
+    "Router busy",             # 0x08
+    "Module busy",             # 0x09
+)
+
+# Command names, indexed by CMD code (None = unknown)
+_CMD_NAMES = (
+    "IMMEDIATE_UPLINK",    # 0x00
+    None, None, None, None,
+    "SET_PARAMETER",       # 0x05
+    "GET_PARAMETER",       # 0x06
+    "SENSOR_DFU",          # 0x07
+    "DEVICE_RESET",        # 0x08
+    None, None, None, None,
+    "GET_DEVICE_SETTING",  # 0x0D - From illuminance spec 6-4
+)
+
+# GET_PARAMETER request data (spec 6-4): SensorID, CMD 0x0D, Sequence No, Data
+_GET_PARAM_DATA = struct.pack('<HBHB', 0x0000, 0x0D, 0xFFFF, 0x00)
+
+# Commands probed by the discovery test: (cmd, name, data)
+_TEST_COMMANDS = (
+    # Standard commands
+    (0x00, "IMMEDIATE_UPLINK", b''),
+    (0x05, "SET_PARAMETER", b''),
+    (0x06, "GET_PARAMETER", b''),
+    (0x07, "SENSOR_DFU", b''),
+    (0x08, "DEVICE_RESET", b''),
+    
+    # Illuminance-specific commands from spec 6-4
+    (0x06, "GET_PARAMETER_WITH_DATA", _GET_PARAM_DATA),
+    
+    # Try other possible commands
+    (0x0D, "GET_DEVICE_SETTING", b''),
+    (0x01, "TEST_CMD_01", b''),
+    (0x02, "TEST_CMD_02", b''),
+    (0x03, "TEST_CMD_03", b''),
+    (0x04, "TEST_CMD_04", b''),
+    (0x09, "TEST_CMD_09", b''),
+    (0x0A, "TEST_CMD_0A", b''),
+    (0x0B, "TEST_CMD_0B", b''),
+    (0x0C, "TEST_CMD_0C", b''),
+    (0x0E, "TEST_CMD_0E", b''),
+    (0x0F, "TEST_CMD_0F", b''),
+)
+
+@lru_cache(maxsize=1024)
+def _format_time(unix_time: int) -> str:
+    """Format a response's UnixTime as local HH:MM:SS, cached per second"""
+    return datetime.fromtimestamp(unix_time).strftime('%H:%M:%S')
 
 # Global flag for graceful shutdown
 test_running = True
 downlink_responses = []
 test_results = []
 
+# Outstanding requests awaiting their downlink response, keyed by CMD.
+# Downlink Order is fixed at 0x0000, so the echoed CMD is all that
+# identifies a response. Several tests share a CMD (GET_PARAMETER with and
+# without data), so a CMD whose request timed out is kept in _timed_out and
+# its next response is dropped as the late reply to that request instead
+# of being handed to a newer request.
+_pending = {}
+_timed_out = set()
+_pending_lock = threading.Lock()
+
 def signal_handler(signum, frame):
     """Handle Ctrl+C gracefully"""
     global test_running
     print("\n🛑 Stopping command discovery test...")
     test_running = False
+    # Release a main loop blocked on a response
+    with _pending_lock:
+        futures = list(_pending.values())
+        _pending.clear()
+    for fut in futures:
+        fut.cancel()
 
-def create_downlink_request(device_id: int, sensor_id: int, cmd: int, data: bytes = b'') -> bytes:
-    """Create downlink request packet"""
-    protocol_version = 0x01
-    packet_type = 0x00  # Downlink request
-    data_length = len(data)
-    unix_time = int(time.time())
-    order = 0x0000
+def parse_downlink_response(data: bytes, verbose: bool = False) -> dict:
+    """
+    Parse downlink response (Type: 0x01)
     
-    packet = struct.pack('<BB', protocol_version, packet_type)
-    packet += struct.pack('<H', data_length)
-    packet += struct.pack('<L', unix_time)
-    packet += struct.pack('<Q', device_id)
-    packet += struct.pack('<H', sensor_id)
-    packet += struct.pack('<B', cmd)
-    packet += struct.pack('<H', order)
-    packet += data
+    Args:
+        data: Raw response packet
+        verbose: Include the hex dump of the packet ("raw") in the result
+    """
+    # Validate structure up front; past this point the decode cannot fail
+    if len(data) < 20:
+        return {"error": "Response too short", "raw": data.hex(' ').upper()}
+    if data[1] != 0x01:
+        return {"error": "Not a downlink response", "raw": data.hex(' ').upper()}
     
-    return packet
-
-def parse_downlink_response(data: bytes) -> dict:
-    """Parse downlink response (Type: 0x01)"""
-    try:
-        if len(data) < 20:
-            return {"error": "Response too short", "raw": data.hex(' ').upper()}
-        
-        protocol_version = data[0]
-        packet_type = data[1]
-        unix_time = struct.unpack('<L', data[2:6])[0]
-        device_id = struct.unpack('<Q', data[6:14])[0]
-        sensor_id = struct.unpack('<H', data[14:16])[0]
-        order = struct.unpack('<H', data[16:18])[0]
-        cmd = data[18]
-        result = data[19]
-        
-        return {
-            "protocol_version": f"0x{protocol_version:02X}",
-            "type": f"0x{packet_type:02X}",
-            "type_name": "DOWNLINK_RESPONSE",
-            "unix_time": unix_time,
-            "timestamp": datetime.fromtimestamp(unix_time).strftime('%H:%M:%S'),
-            "device_id": f"0x{device_id:016X}",
-            "sensor_id": f"0x{sensor_id:04X}",
-            "order": order,
-            "cmd": f"0x{cmd:02X}",
-            "cmd_name": get_cmd_name(cmd),
-            "result": f"0x{result:02X}",
-            "result_desc": get_result_description(result),
-            "success": result == 0x00,
-            "raw": data.hex(' ').upper()
-        }
-        
-    except Exception as e:
-        return {"error": f"Parse error: {e}", "raw": data.hex(' ').upper()}
+    (protocol_version, packet_type, unix_time, device_id,
+     sensor_id, order, cmd, result) = _RESP_HDR.unpack_from(data)
+    
+    response = {
+        "protocol_version": f"0x{protocol_version:02X}",
+        "type": f"0x{packet_type:02X}",
+        "type_name": "DOWNLINK_RESPONSE",
+        "unix_time": unix_time,
+        "timestamp": _format_time(unix_time),
+        "device_id": f"0x{device_id:016X}",
+        "sensor_id": f"0x{sensor_id:04X}",
+        "order": order,
+        "cmd": f"0x{cmd:02X}",
+        "cmd_name": get_cmd_name(cmd),
+        "result": f"0x{result:02X}",
+        "result_desc": get_result_description(result),
+        "success": result == 0x00
+    }
+    if verbose:
+        response["raw"] = data.hex(' ').upper()
+    
+    return response
 
 def get_result_description(result: int) -> str:
     """Get result code description"""
-    descriptions = {
-        0x00: "Success",
-        0x01: "Invalid Sensor ID",
-        0x02: "Unsupported CMD",
-        0x03: "Parameter out of range",
-        0x04: "Connection failed", 
-        0x05: "Timeout",
-        0x07: "Device not found",
-        0x08: "Router busy",
-        0x09: "Module busy"
-    }
-    return descriptions.get(result, f"Unknown result (0x{result:02X})")
+    if 0 <= result < len(_RESULT_DESC) and _RESULT_DESC[result]:
+        return _RESULT_DESC[result]
+    return f"Unknown result (0x{result:02X})"
 
 def get_cmd_name(cmd: int) -> str:
     """Get command name"""
-    commands = {
-        0x00: "IMMEDIATE_UPLINK",
-        0x05: "SET_PARAMETER", 
-        0x06: "GET_PARAMETER",
-        0x07: "SENSOR_DFU",
-        0x08: "DEVICE_RESET",
-        0x0D: "GET_DEVICE_SETTING"  # From illuminance spec 6-4
-    }
-    return commands.get(cmd, f"UNKNOWN(0x{cmd:02X})")
+    if 0 <= cmd < len(_CMD_NAMES) and _CMD_NAMES[cmd]:
+        return _CMD_NAMES[cmd]
+    return f"UNKNOWN(0x{cmd:02X})"
 
 def create_test_commands(device_id: int) -> list:
-    """Create list of test commands to try"""
+    """
+    Create list of test commands to try
+    
+    Each request is packed once up front; only the unix_time field is
+    patched in just before sending (see stamp_request).
+    
+    Returns:
+        List of (name, cmd, data, request) tuples, request being a bytearray
+    """
     sensor_id = 0x0121  # Illuminance sensor
     
-    commands = [
-        # Standard commands
-        {"cmd": 0x00, "name": "IMMEDIATE_UPLINK", "data": b''},
-        {"cmd": 0x05, "name": "SET_PARAMETER", "data": b''},
-        {"cmd": 0x06, "name": "GET_PARAMETER", "data": b''},
-        {"cmd": 0x07, "name": "SENSOR_DFU", "data": b''},
-        {"cmd": 0x08, "name": "DEVICE_RESET", "data": b''},
-        
-        # Illuminance-specific commands from spec 6-4
-        {"cmd": 0x06, "name": "GET_PARAMETER_WITH_DATA", "data": struct.pack('<HBHB', 0x0000, 0x0D, 0xFFFF, 0x00)},
-        
-        # Try other possible commands
-        {"cmd": 0x0D, "name": "GET_DEVICE_SETTING", "data": b''},
-        {"cmd": 0x01, "name": "TEST_CMD_01", "data": b''},
-        {"cmd": 0x02, "name": "TEST_CMD_02", "data": b''},
-        {"cmd": 0x03, "name": "TEST_CMD_03", "data": b''},
-        {"cmd": 0x04, "name": "TEST_CMD_04", "data": b''},
-        {"cmd": 0x09, "name": "TEST_CMD_09", "data": b''},
-        {"cmd": 0x0A, "name": "TEST_CMD_0A", "data": b''},
-        {"cmd": 0x0B, "name": "TEST_CMD_0B", "data": b''},
-        {"cmd": 0x0C, "name": "TEST_CMD_0C", "data": b''},
-        {"cmd": 0x0E, "name": "TEST_CMD_0E", "data": b''},
-        {"cmd": 0x0F, "name": "TEST_CMD_0F", "data": b''}
+    return [
+        (name, cmd, data, create_request_template(device_id, sensor_id, cmd, data))
+        for cmd, name, data in _TEST_COMMANDS
     ]
+
+def create_request_template(device_id: int, sensor_id: int, cmd: int, data: bytes = b'') -> bytearray:
+    """Create downlink request packet with a zero unix_time, to be stamped at send time"""
+    return bytearray(_REQ_HDR.pack(0x01, 0x00, len(data), 0, device_id, sensor_id, cmd, 0x0000)) + data
+
+def stamp_request(template: bytearray) -> bytes:
+    """Patch the current unix_time into a request template in place"""
+    _UNIX_TIME.pack_into(template, _UNIX_TIME_OFFSET, int(time.time()))
+    return bytes(template)
+
+def send_command(monitor: AsyncSerialMonitor, cmd: int, template: bytearray) -> Optional[Future]:
+    """
+    Stamp and send a pre-packed request
     
-    return commands
+    Returns:
+        Future resolved with the parsed downlink response, or None if the send failed
+    """
+    fut = Future()
+    with _pending_lock:
+        _pending[cmd] = fut
+    
+    packet = stamp_request(template)
+    print(f"   Request: {packet.hex(' ').upper()}")
+    
+    if not monitor.send(packet):
+        with _pending_lock:
+            _pending.pop(cmd, None)
+        return None
+    return fut
 
 def on_data_received(data: bytes):
     """Callback for received data - focus on downlink responses"""
     global downlink_responses
     
-    if len(data) < 2:
+    packet_type, sensor_id = classify(data)
+    if packet_type is None:
         return
-        
-    packet_type = data[1]
     
-    if packet_type == 0x01:  # Downlink response - THIS IS WHAT WE WANT
+    if packet_type == PACKET_TYPE_DOWNLINK_RESPONSE:  # THIS IS WHAT WE WANT
         print(f"\n✅ DOWNLINK RESPONSE DETECTED!")
         print(f"   Raw: {data.hex(' ').upper()}")
         
@@ -157,13 +229,25 @@ def on_data_received(data: bytes):
         print(f"   Device: {response.get('device_id', 'Unknown')}")
         print(f"   Time: {response.get('timestamp', 'Unknown')}")
         
-    elif packet_type == 0x00:  # Uplink notification - ignore for now
-        if len(data) >= 18:
-            sensor_id = struct.unpack('<H', data[16:18])[0]
-            if sensor_id == 0x0121:
-                print(f"📦 Illuminance uplink (ignoring)")
-            else:
-                print(f"📦 Other sensor uplink: 0x{sensor_id:04X}")
+        # Hand the response to the request waiting on this CMD (after
+        # printing, so main's output follows this block)
+        if len(data) >= 20:
+            cmd = data[18]
+            with _pending_lock:
+                if cmd in _timed_out:
+                    _timed_out.discard(cmd)
+                    fut = None
+                    print(f"   ⚠️  Late response to a timed-out request, ignored")
+                else:
+                    fut = _pending.pop(cmd, None)
+            if fut is not None and fut.set_running_or_notify_cancel():
+                fut.set_result(response)
+        
+    elif packet_type == PACKET_TYPE_UPLINK:  # Uplink notification - ignore for now
+        if sensor_id == SENSOR_ID_ILLUMINANCE:
+            print(f"📦 Illuminance uplink (ignoring)")
+        elif sensor_id is not None:
+            print(f"📦 Other sensor uplink: 0x{sensor_id:04X}")
     else:
         print(f"📦 Other packet type: 0x{packet_type:02X}")
 
@@ -211,38 +295,40 @@ def main():
             print(f"\n🚀 Testing {len(test_commands)} commands...")
             print(f"   Looking for Type: 0x01 (DOWNLINK_RESPONSE)")
             
-            for i, cmd_info in enumerate(test_commands):
+            for i, (name, cmd, data, template) in enumerate(test_commands):
                 if not test_running:
                     break
                 
-                cmd = cmd_info["cmd"]
-                name = cmd_info["name"]
-                data = cmd_info["data"]
-                
                 print(f"\n📤 Test {i+1}/{len(test_commands)}: {name} (0x{cmd:02X})")
                 
-                # Create and send request
-                packet = create_downlink_request(illuminance_device_id, 0x0121, cmd, data)
-                print(f"   Request: {packet.hex(' ').upper()}")
-                
-                # Track responses before sending
-                initial_responses = len(downlink_responses)
-                
-                if monitor.send(packet):
+                fut = send_command(monitor, cmd, template)
+                if fut is not None:
                     print(f"   ✅ Sent")
                 else:
                     print(f"   ❌ Send failed")
                     continue
                 
                 # Wait for response (5 seconds max)
-                response_start = time.time()
-                response_received = False
-                
-                while (time.time() - response_start) < 5 and test_running:
-                    if len(downlink_responses) > initial_responses:
+                response_start = time.monotonic()
+                try:
+                    latest_response = fut.result(timeout=5)
+                    response_received = True
+                except FutureTimeoutError:
+                    with _pending_lock:
+                        timed_out = _pending.pop(cmd, None) is not None
+                        if timed_out:
+                            # A reply may still arrive late for this request
+                            _timed_out.add(cmd)
+                    if timed_out:
+                        latest_response = None
+                        response_received = False
+                    else:
+                        # The callback claimed the response just now
+                        latest_response = fut.result()
                         response_received = True
-                        break
-                    time.sleep(0.1)
+                except CancelledError:
+                    latest_response = None
+                    response_received = False
                 
                 # Record result
                 result = {
@@ -250,11 +336,10 @@ def main():
                     "cmd_code": f"0x{cmd:02X}",
                     "data_length": len(data),
                     "response_received": response_received,
-                    "response_time": time.time() - response_start if response_received else None
+                    "response_time": time.monotonic() - response_start if response_received else None
                 }
                 
                 if response_received:
-                    latest_response = downlink_responses[-1]
                     result.update({
                         "result_code": latest_response.get('result', 'Unknown'),
                         "result_desc": latest_response.get('result_desc', 'Unknown'),
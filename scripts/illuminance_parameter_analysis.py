@@ -11,216 +11,308 @@ import struct
 import json
 import sys
 from datetime import datetime
+from typing import Optional
 from async_serial_monitor import AsyncSerialMonitor
+from bravejig_rx import classify, PACKET_TYPE_UPLINK, SENSOR_ID_ILLUMINANCE
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+# Spec 5-2 sensor data layout: SensorID, Sequence No, Connected Sensor ID,
+# FW Version (3 x 1 byte), TimeZone, BLE Mode, Tx Power, Advertise Interval,
+# Sensor Uplink Interval, Sensor Read Mode, Sampling, HysteresisHigh/Low
+_SENSOR_DATA = struct.Struct('<HHHBBBBBBHLBBff')
+
+# Static per-field metadata, merged after 'value' (and the FW version parts)
+_PARAM_META = {
+    'end_device_sensor_id': {
+        'description': 'エンドデバイス本体'
+    },
+    'connected_sensor_id': {
+        'description': '本製品に接続されているSensorのSensorID',
+        'expected': '0x0121'
+    },
+    'fw_version': {
+        'description': '本製品のFWバージョン'
+    },
+    'timezone': {
+        'description': 'タイムゾーン設定'
+    },
+    'ble_mode': {
+        'description': 'Bluetooth LE通信モードの設定情報'
+    },
+    'tx_power': {
+        'description': 'Bluetooth LE通信の送信電波出力'
+    },
+    'advertise_interval': {
+        'description': 'Advertiseを発信する間隔',
+        'encoding': 'リトルエンディアン'
+    },
+    'sensor_uplink_interval': {
+        'unit': 'seconds',
+        'description': 'Sensor情報データをUplinkする間隔',
+        'encoding': 'リトルエンディアン'
+    },
+    'sensor_read_mode': {
+        'description': '計測モード'
+    },
+    'sampling': {
+        'description': 'サンプリング周期'
+    },
+    'hysteresis_high': {
+        'unit': 'Lux',
+        'description': 'ヒステリシス(High):照度(Lux)',
+        'encoding': 'リトルエンディアン IEEE 754 Float'
+    },
+    'hysteresis_low': {
+        'unit': 'Lux',
+        'description': 'ヒステリシス(Low):照度(Lux)',
+        'encoding': 'リトルエンディアン IEEE 754 Float'
+    },
+    'remaining_data': {
+        'description': '仕様書に記載されていない追加データ'
+    }
+}
+
+# Field byte offsets within the sensor data (fast path, verbose dumps)
+_SENSOR_DATA_OFFSETS = (
+    ('end_device_sensor_id', 0, 2),
+    ('sequence_no', 2, 2),
+    ('connected_sensor_id', 4, 2),
+    ('fw_version', 6, 3),
+    ('timezone', 9, 1),
+    ('ble_mode', 10, 1),
+    ('tx_power', 11, 1),
+    ('advertise_interval', 12, 2),
+    ('sensor_uplink_interval', 14, 4),
+    ('sensor_read_mode', 18, 1),
+    ('sampling', 19, 1),
+    ('hysteresis_high', 20, 4),
+    ('hysteresis_low', 24, 4)
+)
 
 # Global storage for parameter data
 parameter_data = []
 
-def parse_illuminance_parameter_detailed(data: bytes) -> dict:
-    """Parse illuminance parameter information according to spec 5-2"""
-    try:
-        if len(data) < 21:
-            return {'error': 'Packet too short'}
-            
-        # Common header
-        sensor_id = struct.unpack('<H', data[16:18])[0]
-        if sensor_id != 0x0121:
-            return {'error': 'Not illuminance sensor'}
-            
-        # Sensor data starts at index 21
-        sensor_data = data[21:]
-        print(f'📊 Sensor data ({len(sensor_data)} bytes): {sensor_data.hex(" ").upper()}')
+def parse_illuminance_parameter_detailed(data: bytes, verbose: bool = False,
+                                         received_at: Optional[datetime] = None) -> dict:
+    """
+    Parse illuminance parameter information according to spec 5-2
+    
+    Args:
+        data: Raw uplink packet
+        verbose: Include per-field hex dumps ("bytes") in the result
+        received_at: Receive time recorded as packet_info.timestamp
+    """
+    # Validate structure up front; past this point every read is in bounds
+    if len(data) < 21:
+        return {'error': 'Packet too short'}
         
-        result = {
-            'packet_info': {
-                'total_length': len(data),
-                'sensor_data_length': len(sensor_data),
-                'timestamp': datetime.now().isoformat(),
-                'sensor_id': f'0x{sensor_id:04X}',
-                'device_id': f'0x{struct.unpack("<Q", data[8:16])[0]:016X}'
-            },
-            'parameter_info': {}
-        }
+    # Zero-copy view: all field reads below go through unpack_from/indexing
+    mv = memoryview(data)
+    
+    # Common header
+    sensor_id = struct.unpack_from('<H', mv, 16)[0]
+    if sensor_id != 0x0121:
+        return {'error': 'Not illuminance sensor'}
+        
+    # Sensor data starts at index 21
+    sensor_data = mv[21:]
+    
+    # Format the sensor data once; each byte takes 3 chars ("HH "), so the
+    # dump of bytes [offset, offset+n) is full_hex[offset*3:(offset+n)*3-1]
+    full_hex = sensor_data.hex(' ').upper() if verbose else ''
+    if verbose:
+        print(f'📊 Sensor data ({len(sensor_data)} bytes): {full_hex}')
+    
+    packet_info = {
+        'total_length': len(data),
+        'sensor_data_length': len(sensor_data)
+    }
+    # The caller supplies the receive time so the parser itself stays clock-free
+    if received_at is not None:
+        packet_info['timestamp'] = received_at.isoformat()
+    packet_info['sensor_id'] = f'0x{sensor_id:04X}'
+    packet_info['device_id'] = f'0x{struct.unpack_from("<Q", mv, 8)[0]:016X}'
+    result = {
+        'packet_info': packet_info,
+        'parameter_info': {}
+    }
+    
+    if len(sensor_data) >= _SENSOR_DATA.size:
+        # Fast path: spec-compliant packet, decode every field in one call
+        (param_sensor_id, sequence_no, connected_sensor_id, major, minor, patch,
+         timezone, ble_mode, tx_power, adv_interval, uplink_interval,
+         read_mode, sampling, hysteresis_high, hysteresis_low) = _SENSOR_DATA.unpack_from(sensor_data)
         
+        parameter_info = {
+            'end_device_sensor_id': {'value': f'0x{param_sensor_id:04X}', **_PARAM_META['end_device_sensor_id']},
+            'sequence_no': {'value': sequence_no, 'hex': f'0x{sequence_no:04X}'},
+            'sensor_data': {
+                'connected_sensor_id': {'value': f'0x{connected_sensor_id:04X}', **_PARAM_META['connected_sensor_id']},
+                'fw_version': {'value': f'{major}.{minor}.{patch}', 'major': major, 'minor': minor, 'patch': patch,
+                               **_PARAM_META['fw_version']},
+                'timezone': {'value': timezone, **_PARAM_META['timezone']},
+                'ble_mode': {'value': ble_mode, **_PARAM_META['ble_mode']},
+                'tx_power': {'value': tx_power, **_PARAM_META['tx_power']},
+                'advertise_interval': {'value': adv_interval, **_PARAM_META['advertise_interval']},
+                'sensor_uplink_interval': {'value': uplink_interval, **_PARAM_META['sensor_uplink_interval']},
+                'sensor_read_mode': {'value': read_mode, **_PARAM_META['sensor_read_mode']},
+                'sampling': {'value': sampling, **_PARAM_META['sampling']},
+                'hysteresis_high': {'value': hysteresis_high, **_PARAM_META['hysteresis_high']},
+                'hysteresis_low': {'value': hysteresis_low, **_PARAM_META['hysteresis_low']}
+            }
+        }
+        if verbose:
+            for name, field_offset, size in _SENSOR_DATA_OFFSETS:
+                entry = parameter_info.get(name) or parameter_info['sensor_data'][name]
+                entry['bytes'] = full_hex[field_offset*3:(field_offset+size)*3-1]
+        result['parameter_info'] = parameter_info
+        offset = _SENSOR_DATA.size
+    else:
         if len(sensor_data) < 10:
             result['error'] = 'Insufficient sensor data'
             return result
-            
-        offset = 0
+        offset = _parse_truncated_sensor_data(sensor_data, result['parameter_info'], full_hex, verbose)
         
-        # SensorID (2 bytes) - エンドデバイス本体
-        if offset + 2 <= len(sensor_data):
-            param_sensor_id = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result['parameter_info']['end_device_sensor_id'] = {
-                'value': f'0x{param_sensor_id:04X}',
-                'description': 'エンドデバイス本体',
-                'bytes': sensor_data[offset:offset+2].hex(' ').upper()
-            }
-            offset += 2
-            
-        # Sequence No (2 bytes)
-        if offset + 2 <= len(sensor_data):
-            sequence_no = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result['parameter_info']['sequence_no'] = {
-                'value': sequence_no,
-                'hex': f'0x{sequence_no:04X}',
-                'bytes': sensor_data[offset:offset+2].hex(' ').upper()
-            }
-            offset += 2
-            
-        # === Sensor Data section starts here ===
-        result['parameter_info']['sensor_data'] = {}
+    # Remaining bytes analysis
+    if offset < len(sensor_data):
+        remaining_data = {'length': len(sensor_data) - offset}
+        if verbose:
+            remaining_data['bytes'] = full_hex[offset*3:]
+        remaining_data.update(_PARAM_META['remaining_data'])
+        result['parameter_info']['remaining_data'] = remaining_data
         
-        # Connected Sensor ID (2 bytes) - 0x0121 固定
-        if offset + 2 <= len(sensor_data):
-            connected_sensor_id = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result['parameter_info']['sensor_data']['connected_sensor_id'] = {
-                'value': f'0x{connected_sensor_id:04X}',
-                'description': '本製品に接続されているSensorのSensorID',
-                'expected': '0x0121',
-                'bytes': sensor_data[offset:offset+2].hex(' ').upper()
-            }
-            offset += 2
-            
-        # FW Version (3 bytes)
-        if offset + 3 <= len(sensor_data):
-            fw_bytes = sensor_data[offset:offset+3]
-            fw_version = f'{fw_bytes[0]}.{fw_bytes[1]}.{fw_bytes[2]}'
-            result['parameter_info']['sensor_data']['fw_version'] = {
-                'value': fw_version,
-                'major': fw_bytes[0],
-                'minor': fw_bytes[1], 
-                'patch': fw_bytes[2],
-                'description': '本製品のFWバージョン',
-                'bytes': fw_bytes.hex(' ').upper()
-            }
-            offset += 3
-            
-        # TimeZone (1 byte)
-        if offset + 1 <= len(sensor_data):
-            timezone = sensor_data[offset]
-            result['parameter_info']['sensor_data']['timezone'] = {
-                'value': timezone,
-                'description': 'タイムゾーン設定',
-                'bytes': f'{timezone:02X}'
-            }
-            offset += 1
-            
-        # BLE Mode (1 byte)  
-        if offset + 1 <= len(sensor_data):
-            ble_mode = sensor_data[offset]
-            result['parameter_info']['sensor_data']['ble_mode'] = {
-                'value': ble_mode,
-                'description': 'Bluetooth LE通信モードの設定情報',
-                'bytes': f'{ble_mode:02X}'
-            }
-            offset += 1
-            
-        # Tx Power (1 byte)
-        if offset + 1 <= len(sensor_data):
-            tx_power = sensor_data[offset]
-            result['parameter_info']['sensor_data']['tx_power'] = {
-                'value': tx_power,
-                'description': 'Bluetooth LE通信の送信電波出力',
-                'bytes': f'{tx_power:02X}'
-            }
-            offset += 1
-            
-        # Advertise Interval (2 bytes, little endian)
-        if offset + 2 <= len(sensor_data):
-            adv_interval = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result['parameter_info']['sensor_data']['advertise_interval'] = {
-                'value': adv_interval,
-                'description': 'Advertiseを発信する間隔',
-                'encoding': 'リトルエンディアン',
-                'bytes': sensor_data[offset:offset+2].hex(' ').upper()
-            }
-            offset += 2
-            
-        # Sensor Uplink Interval (4 bytes, little endian)
-        if offset + 4 <= len(sensor_data):
-            uplink_interval = struct.unpack('<L', sensor_data[offset:offset+4])[0]
-            result['parameter_info']['sensor_data']['sensor_uplink_interval'] = {
-                'value': uplink_interval,
-                'unit': 'seconds',
-                'description': 'Sensor情報データをUplinkする間隔',
-                'encoding': 'リトルエンディアン',
-                'bytes': sensor_data[offset:offset+4].hex(' ').upper()
-            }
-            offset += 4
-            
-        # Sensor Read Mode (1 byte)
+    return result
+
+def _parse_truncated_sensor_data(sensor_data: memoryview, parameter_info: dict, full_hex: str, verbose: bool) -> int:
+    """
+    Field-by-field decode for sensor data shorter than the full spec 5-2 layout
+    
+    Fills parameter_info with every field that is fully present.
+    
+    Returns:
+        Offset of the first byte not consumed
+    """
+    offset = 0
+    
+    # SensorID (2 bytes) - エンドデバイス本体
+    if offset + 2 <= len(sensor_data):
+        param_sensor_id = struct.unpack_from('<H', sensor_data, offset)[0]
+        parameter_info['end_device_sensor_id'] = {
+            'value': f'0x{param_sensor_id:04X}',
+            **_PARAM_META['end_device_sensor_id']
+        }
+        if verbose:
+            parameter_info['end_device_sensor_id']['bytes'] = full_hex[offset*3:(offset+2)*3-1]
+        offset += 2
+        
+    # Sequence No (2 bytes)
+    if offset + 2 <= len(sensor_data):
+        sequence_no = struct.unpack_from('<H', sensor_data, offset)[0]
+        parameter_info['sequence_no'] = {
+            'value': sequence_no,
+            'hex': f'0x{sequence_no:04X}'
+        }
+        if verbose:
+            parameter_info['sequence_no']['bytes'] = full_hex[offset*3:(offset+2)*3-1]
+        offset += 2
+        
+    # === Sensor Data section starts here ===
+    fields = parameter_info['sensor_data'] = {}
+    
+    # Connected Sensor ID (2 bytes) - 0x0121 固定
+    if offset + 2 <= len(sensor_data):
+        connected_sensor_id = struct.unpack_from('<H', sensor_data, offset)[0]
+        fields['connected_sensor_id'] = {
+            'value': f'0x{connected_sensor_id:04X}',
+            **_PARAM_META['connected_sensor_id']
+        }
+        if verbose:
+            fields['connected_sensor_id']['bytes'] = full_hex[offset*3:(offset+2)*3-1]
+        offset += 2
+        
+    # FW Version (3 bytes)
+    if offset + 3 <= len(sensor_data):
+        major, minor, patch = sensor_data[offset], sensor_data[offset+1], sensor_data[offset+2]
+        fields['fw_version'] = {
+            'value': f'{major}.{minor}.{patch}',
+            'major': major,
+            'minor': minor,
+            'patch': patch,
+            **_PARAM_META['fw_version']
+        }
+        if verbose:
+            fields['fw_version']['bytes'] = full_hex[offset*3:(offset+3)*3-1]
+        offset += 3
+        
+    # TimeZone, BLE Mode, Tx Power (1 byte each)
+    for name in ('timezone', 'ble_mode', 'tx_power'):
         if offset + 1 <= len(sensor_data):
-            read_mode = sensor_data[offset]
-            result['parameter_info']['sensor_data']['sensor_read_mode'] = {
-                'value': read_mode,
-                'description': '計測モード',
-                'bytes': f'{read_mode:02X}'
-            }
+            value = sensor_data[offset]
+            fields[name] = {'value': value, **_PARAM_META[name]}
+            if verbose:
+                fields[name]['bytes'] = f'{value:02X}'
             offset += 1
             
-        # Sampling (1 byte)
+    # Advertise Interval (2 bytes, little endian)
+    if offset + 2 <= len(sensor_data):
+        adv_interval = struct.unpack_from('<H', sensor_data, offset)[0]
+        fields['advertise_interval'] = {'value': adv_interval, **_PARAM_META['advertise_interval']}
+        if verbose:
+            fields['advertise_interval']['bytes'] = full_hex[offset*3:(offset+2)*3-1]
+        offset += 2
+        
+    # Sensor Uplink Interval (4 bytes, little endian)
+    if offset + 4 <= len(sensor_data):
+        uplink_interval = struct.unpack_from('<L', sensor_data, offset)[0]
+        fields['sensor_uplink_interval'] = {'value': uplink_interval, **_PARAM_META['sensor_uplink_interval']}
+        if verbose:
+            fields['sensor_uplink_interval']['bytes'] = full_hex[offset*3:(offset+4)*3-1]
+        offset += 4
+        
+    # Sensor Read Mode, Sampling (1 byte each)
+    for name in ('sensor_read_mode', 'sampling'):
         if offset + 1 <= len(sensor_data):
-            sampling = sensor_data[offset]
-            result['parameter_info']['sensor_data']['sampling'] = {
-                'value': sampling,
-                'description': 'サンプリング周期',
-                'bytes': f'{sampling:02X}'
-            }
+            value = sensor_data[offset]
+            fields[name] = {'value': value, **_PARAM_META[name]}
+            if verbose:
+                fields[name]['bytes'] = f'{value:02X}'
             offset += 1
             
-        # HysteresisHigh (4 bytes, little endian, Float)
-        if offset + 4 <= len(sensor_data):
-            hysteresis_high_bytes = sensor_data[offset:offset+4]
-            hysteresis_high = struct.unpack('<f', hysteresis_high_bytes)[0]
-            result['parameter_info']['sensor_data']['hysteresis_high'] = {
-                'value': hysteresis_high,
-                'unit': 'Lux',
-                'description': 'ヒステリシス(High):照度(Lux)',
-                'encoding': 'リトルエンディアン IEEE 754 Float',
-                'bytes': hysteresis_high_bytes.hex(' ').upper()
-            }
-            offset += 4
-            
-        # HysteresisLow (4 bytes, little endian, Float)
+    # HysteresisHigh/Low (4 bytes each, little endian, Float)
+    for name in ('hysteresis_high', 'hysteresis_low'):
         if offset + 4 <= len(sensor_data):
-            hysteresis_low_bytes = sensor_data[offset:offset+4]
-            hysteresis_low = struct.unpack('<f', hysteresis_low_bytes)[0]
-            result['parameter_info']['sensor_data']['hysteresis_low'] = {
-                'value': hysteresis_low,
-                'unit': 'Lux',
-                'description': 'ヒステリシス(Low):照度(Lux)',
-                'encoding': 'リトルエンディアン IEEE 754 Float',
-                'bytes': hysteresis_low_bytes.hex(' ').upper()
-            }
+            value = struct.unpack_from('<f', sensor_data, offset)[0]
+            fields[name] = {'value': value, **_PARAM_META[name]}
+            if verbose:
+                fields[name]['bytes'] = full_hex[offset*3:(offset+4)*3-1]
             offset += 4
             
-        # Remaining bytes analysis
-        if offset < len(sensor_data):
-            remaining = sensor_data[offset:]
-            result['parameter_info']['remaining_data'] = {
-                'length': len(remaining),
-                'bytes': remaining.hex(' ').upper(),
-                'description': '仕様書に記載されていない追加データ'
-            }
-            
-        return result
-        
-    except Exception as e:
-        return {'error': f'Parameter parse error: {e}', 'raw_data': data.hex(' ').upper()}
+    return offset
+
+def dump_json(obj) -> str:
+    """Serialize to indented JSON (non-ASCII kept as-is), using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, ensure_ascii=False, indent=2)
 
 def on_data_received(data: bytes):
     """Callback for received data"""
     global parameter_data
     
-    if len(data) >= 18:
-        packet_type = data[1]
-        sensor_id = struct.unpack('<H', data[16:18])[0]
-        
-        if packet_type == 0x00 and sensor_id == 0x0121:  # Illuminance uplink
-            print(f'\n💡 照度センサーアップリンク検出')
-            detailed_analysis = parse_illuminance_parameter_detailed(data)
-            parameter_data.append(detailed_analysis)
+    # Reject anything that isn't an illuminance uplink before any parsing
+    packet_type, sensor_id = classify(data)
+    if packet_type != PACKET_TYPE_UPLINK or sensor_id != SENSOR_ID_ILLUMINANCE:
+        return
+    
+    print(f'\n💡 照度センサーアップリンク検出')
+    detailed_analysis = parse_illuminance_parameter_detailed(data, verbose=True,
+                                                             received_at=datetime.now())
+    parameter_data.append(detailed_analysis)
 
 def main():
     """Main analysis function"""
@@ -236,13 +328,13 @@ def main():
             monitor.start_monitoring()
             
             # 70秒監視（60秒間隔を確実にキャッチ）
-            start_time = time.time()
-            while time.time() - start_time < 70 and len(parameter_data) == 0:
+            deadline = time.monotonic() + 70
+            while time.monotonic() < deadline and len(parameter_data) == 0:
                 time.sleep(1)
                 
             if parameter_data:
                 # 最初のパケットの詳細解析結果をJSON出力
-                detailed_json = json.dumps(parameter_data[0], ensure_ascii=False, indent=2)
+                detailed_json = dump_json(parameter_data[0])
                 print('\n📊 照度センサーパラメータ情報 (JSON)')
                 print('=' * 60)
                 print(detailed_json)
@@ -11,63 +11,116 @@ import time
 import struct
 import json
 import sys
-from datetime import datetime
+import threading
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional, Union
 from async_serial_monitor import AsyncSerialMonitor
 
-# Global storage
-current_parameters = None
-setting_response = None
-get_response_received = False
-set_response_received = False
-test_failed = False
+# Downlink request header: Ver, Type, DataLen, UnixTime, DeviceID, SensorID, CMD, Order
+_REQ_HDR = struct.Struct('<BBHLQHBH')
+# Downlink response: Ver, Type, UnixTime, DeviceID, SensorID, Order, CMD, Result
+_RESP_HDR = struct.Struct('<BBLQHHBB')
+
+_U16 = struct.Struct('<H')
+
+# Routing fields read from offset 16: uplink SensorID (16-17) and downlink
+# response CMD (18); the other packet type's value at each offset is ignored
+_ROUTE = struct.Struct('<HB')
+
+# Parameter information sensor data (24 bytes): SensorID, FW Version (3 x 1 byte),
+# TimeZone, BLE Mode, Tx Power, Advertise Interval, Sensor Uplink Interval,
+# Sensor Read Mode, Sampling, HysteresisHigh, HysteresisLow
+_SENSOR_INFO = struct.Struct('<HBBBBBBHLBBff')
+
+# Parameter setting data (spec 6-2 DATA): SensorID, TimeZone, BLE Mode, Tx Power,
+# Advertise Interval, Sensor Uplink Interval, Sensor Read Mode, Sampling,
+# HysteresisHigh, HysteresisLow
+_PARAM_SET = struct.Struct('<HBBBHLBBff')
+
+# Result code descriptions, indexed by result code (None = undefined)
+_RESULT_DESC = (
+    "Success",                 # 0x00
+    "Invalid Sensor ID",       # 0x01
+    "Unsupported CMD",         # 0x02
+    "Parameter out of range",  # 0x03
+    "Connection failed",       # 0x04
+    "Timeout",                 # 0x05
+    None,                      # 0x06
+    "Device not found",        # 0x07
+    "Router busy",             # 0x08
+    "Module busy",             # 0x09
+)
+
+# Command names, indexed by CMD code (None = unknown)
+_CMD_NAMES = (
+    "IMMEDIATE_UPLINK",    # 0x00
+    None, None, None, None,
+    "SET_PARAMETER",       # 0x05
+    "GET_PARAMETER",       # 0x06
+    "SENSOR_DFU",          # 0x07
+    "DEVICE_RESET",        # 0x08
+    None, None, None, None,
+    "GET_DEVICE_SETTING",  # 0x0D
+)
+
+# Writable parameters: name -> (type, min, max)
+_VALIDATION = {
+    "advertise_interval": (int, 0, 65535),              # milliseconds
+    "sensor_uplink_interval": (int, 1, 4294967295),     # seconds
+    "timezone": (int, 0, 255),
+    "ble_mode": (int, 0, 255),
+    "tx_power": (int, 0, 255),
+    "sensor_read_mode": (int, 0, 255),
+    "sampling": (int, 0, 255),
+    "hysteresis_high": (float, 0.0, 100000.0),          # lux
+    "hysteresis_low": (float, 0.0, 100000.0)            # lux
+}
+
+class ParameterInfo(NamedTuple):
+    """Parameter information uplink sensor data (照度モジュール仕様書 5-2)"""
+    sensor_id: int
+    fw_version: str  # "major.minor.patch"
+    timezone: int
+    ble_mode: int
+    tx_power: int
+    advertise_interval: int
+    sensor_uplink_interval: int
+    sensor_read_mode: int
+    sampling: int
+    hysteresis_high: float
+    hysteresis_low: float
+
+@dataclass
+class SettingTestState:
+    """State shared between the receive callback and main for one test run"""
+    current_parameters: Optional[ParameterInfo] = None
+    setting_response: Optional[dict] = None
+    get_response_received: threading.Event = field(default_factory=threading.Event)
+    set_response_received: threading.Event = field(default_factory=threading.Event)
+    test_failed: bool = False
+
+def create_downlink_request(device_id: int, cmd: int, data: bytes) -> bytes:
+    """Create downlink request packet for the end device main unit"""
+    header = _REQ_HDR.pack(0x01,              # Protocol version
+                           0x00,              # Downlink request
+                           len(data),         # Data length
+                           int(time.time()),  # Unix time
+                           device_id,
+                           0x0000,            # End device main unit (SensorID fixed)
+                           cmd,
+                           0xFFFF)            # Order: fixed value according to spec 6-2
+    return header + data
 
 def create_parameter_get_request(device_id: int) -> bytes:
     """Create parameter acquisition request (CMD: 0x0D)"""
-    protocol_version = 0x01
-    packet_type = 0x00  # Downlink request
-    unix_time = int(time.time())
-    sensor_id = 0x0000  # Fixed for parameter acquisition
-    cmd = 0x0D  # GET_DEVICE_SETTING
-    order = 0xFFFF
-    data = bytes([0x00])  # 1 byte only
-    data_length = len(data)  # 1
-    
-    # Build complete downlink request packet
-    packet = struct.pack('<BB', protocol_version, packet_type)
-    packet += struct.pack('<H', data_length)
-    packet += struct.pack('<L', unix_time)
-    packet += struct.pack('<Q', device_id)
-    packet += struct.pack('<H', sensor_id)
-    packet += struct.pack('<B', cmd)
-    packet += struct.pack('<H', order)
-    packet += data
-    
-    return packet
+    return create_downlink_request(device_id, 0x0D, b'\x00')  # GET_DEVICE_SETTING, 1 byte data
 
 def create_parameter_set_request(device_id: int, param_data: bytes) -> bytes:
     """Create parameter setting request (CMD: 0x05) according to spec 6-2"""
-    protocol_version = 0x01
-    packet_type = 0x00  # Downlink request
-    unix_time = int(time.time())
-    sensor_id = 0x0000  # End device main unit (spec 6-2 requirement)
-    cmd = 0x05  # SET_REGISTER (SET_PARAMETER)
-    order = 0xFFFF  # Fixed value according to spec 6-2
-    data_length = len(param_data)
-    
-    # Build complete downlink request packet
-    packet = struct.pack('<BB', protocol_version, packet_type)
-    packet += struct.pack('<H', data_length)
-    packet += struct.pack('<L', unix_time)
-    packet += struct.pack('<Q', device_id)
-    packet += struct.pack('<H', sensor_id)
-    packet += struct.pack('<B', cmd)
-    packet += struct.pack('<H', order)
-    packet += param_data
-    
-    return packet
+    return create_downlink_request(device_id, 0x05, param_data)  # SET_REGISTER (SET_PARAMETER)
 
-def parse_parameter_information(data: bytes) -> dict:
-    """Parse parameter information uplink"""
+def parse_parameter_information(data: bytes) -> Union[ParameterInfo, dict]:
+    """Parse parameter information uplink (ParameterInfo, or a dict with "error")"""
     try:
         if len(data) < 21:
             return {"error": "Packet too short for uplink"}
@@ -76,269 +129,116 @@ def parse_parameter_information(data: bytes) -> dict:
         if packet_type != 0x00:
             return {"error": f"Not uplink notification, got type 0x{packet_type:02X}"}
         
-        sensor_id = struct.unpack('<H', data[16:18])[0]
+        sensor_id = _U16.unpack_from(data, 16)[0]
         if sensor_id != 0x0000:
             return {"error": f"Not parameter info, sensor ID is 0x{sensor_id:04X}"}
         
         # Sensor data starts at index 21
         sensor_data = data[21:]
         
-        if len(sensor_data) < 24:
-            return {"error": f"Insufficient sensor data (got {len(sensor_data)}, need 24)"}
+        if len(sensor_data) < _SENSOR_INFO.size:
+            return {"error": f"Insufficient sensor data (got {len(sensor_data)}, need {_SENSOR_INFO.size})"}
         
         # Parse sensor data according to confirmed structure
-        offset = 0
-        sensor_data_info = {}
-        
-        # SensorID (2 bytes)
-        illuminance_sensor_id = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-        sensor_data_info["sensor_id"] = {
-            "value": illuminance_sensor_id,
-            "hex": f"0x{illuminance_sensor_id:04X}",
-            "raw_bytes": sensor_data[offset:offset+2]
-        }
-        offset += 2
-        
-        # FW Version (3 bytes)
-        fw_bytes = sensor_data[offset:offset+3]
-        sensor_data_info["fw_version"] = {
-            "value": f"{fw_bytes[0]}.{fw_bytes[1]}.{fw_bytes[2]}",
-            "major": fw_bytes[0],
-            "minor": fw_bytes[1],
-            "patch": fw_bytes[2],
-            "raw_bytes": fw_bytes
-        }
-        offset += 3
-        
-        # TimeZone (1 byte)
-        timezone = sensor_data[offset]
-        sensor_data_info["timezone"] = {
-            "value": timezone,
-            "raw_bytes": sensor_data[offset:offset+1]
-        }
-        offset += 1
-        
-        # BLE Mode (1 byte)
-        ble_mode = sensor_data[offset]
-        sensor_data_info["ble_mode"] = {
-            "value": ble_mode,
-            "raw_bytes": sensor_data[offset:offset+1]
-        }
-        offset += 1
-        
-        # Tx Power (1 byte)
-        tx_power = sensor_data[offset]
-        sensor_data_info["tx_power"] = {
-            "value": tx_power,
-            "raw_bytes": sensor_data[offset:offset+1]
-        }
-        offset += 1
-        
-        # Advertise Interval (2 bytes, little endian)
-        adv_interval = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-        sensor_data_info["advertise_interval"] = {
-            "value": adv_interval,
-            "raw_bytes": sensor_data[offset:offset+2]
-        }
-        offset += 2
-        
-        # Sensor Uplink Interval (4 bytes, little endian)
-        uplink_interval = struct.unpack('<L', sensor_data[offset:offset+4])[0]
-        sensor_data_info["sensor_uplink_interval"] = {
-            "value": uplink_interval,
-            "raw_bytes": sensor_data[offset:offset+4]
-        }
-        offset += 4
-        
-        # Sensor Read Mode (1 byte)
-        read_mode = sensor_data[offset]
-        sensor_data_info["sensor_read_mode"] = {
-            "value": read_mode,
-            "raw_bytes": sensor_data[offset:offset+1]
-        }
-        offset += 1
-        
-        # Sampling (1 byte)
-        sampling = sensor_data[offset]
-        sensor_data_info["sampling"] = {
-            "value": sampling,
-            "raw_bytes": sensor_data[offset:offset+1]
-        }
-        offset += 1
-        
-        # HysteresisHigh (4 bytes, little endian, IEEE 754 Float)
-        hysteresis_high_bytes = sensor_data[offset:offset+4]
-        hysteresis_high = struct.unpack('<f', hysteresis_high_bytes)[0]
-        sensor_data_info["hysteresis_high"] = {
-            "value": hysteresis_high,
-            "raw_bytes": hysteresis_high_bytes
-        }
-        offset += 4
-        
-        # HysteresisLow (4 bytes, little endian, IEEE 754 Float)
-        hysteresis_low_bytes = sensor_data[offset:offset+4]
-        hysteresis_low = struct.unpack('<f', hysteresis_low_bytes)[0]
-        sensor_data_info["hysteresis_low"] = {
-            "value": hysteresis_low,
-            "raw_bytes": hysteresis_low_bytes
-        }
-        offset += 4
+        (illuminance_sensor_id, fw_major, fw_minor, fw_patch, timezone, ble_mode,
+         tx_power, adv_interval, uplink_interval, read_mode, sampling,
+         hysteresis_high, hysteresis_low) = _SENSOR_INFO.unpack_from(sensor_data, 0)
         
-        return sensor_data_info
+        return ParameterInfo(illuminance_sensor_id, f"{fw_major}.{fw_minor}.{fw_patch}",
+                             timezone, ble_mode, tx_power, adv_interval, uplink_interval,
+                             read_mode, sampling, hysteresis_high, hysteresis_low)
         
     except Exception as e:
         return {"error": f"Parameter parsing error: {e}"}
 
 def validate_parameter_value(parameter_name: str, value: any) -> bool:
     """Validate parameter value according to spec"""
-    
-    validation_rules = {
-        "advertise_interval": {
-            "type": int,
-            "min": 0,
-            "max": 65535,
-            "unit": "milliseconds"
-        },
-        "sensor_uplink_interval": {
-            "type": int,
-            "min": 1,
-            "max": 4294967295,
-            "unit": "seconds"
-        },
-        "timezone": {
-            "type": int,
-            "min": 0,
-            "max": 255
-        },
-        "ble_mode": {
-            "type": int,
-            "min": 0,
-            "max": 255
-        },
-        "tx_power": {
-            "type": int,
-            "min": 0,
-            "max": 255
-        },
-        "sensor_read_mode": {
-            "type": int,
-            "min": 0,
-            "max": 255
-        },
-        "sampling": {
-            "type": int,
-            "min": 0,
-            "max": 255
-        },
-        "hysteresis_high": {
-            "type": float,
-            "min": 0.0,
-            "max": 100000.0,
-            "unit": "lux"
-        },
-        "hysteresis_low": {
-            "type": float,
-            "min": 0.0,
-            "max": 100000.0,
-            "unit": "lux"
-        }
-    }
-    
-    if parameter_name not in validation_rules:
+    rules = _VALIDATION.get(parameter_name)
+    if rules is None:
         raise ValueError(f"Unknown parameter: {parameter_name}")
     
-    rules = validation_rules[parameter_name]
+    value_type, min_value, max_value = rules
     
     # Type check
-    if not isinstance(value, rules["type"]):
-        raise TypeError(f"Parameter '{parameter_name}' must be {rules['type'].__name__}")
+    if not isinstance(value, value_type):
+        raise TypeError(f"Parameter '{parameter_name}' must be {value_type.__name__}")
     
     # Range check
-    if "min" in rules and value < rules["min"]:
-        raise ValueError(f"Parameter '{parameter_name}' must be >= {rules['min']}")
+    if value < min_value:
+        raise ValueError(f"Parameter '{parameter_name}' must be >= {min_value}")
     
-    if "max" in rules and value > rules["max"]:
-        raise ValueError(f"Parameter '{parameter_name}' must be <= {rules['max']}")
+    if value > max_value:
+        raise ValueError(f"Parameter '{parameter_name}' must be <= {max_value}")
     
     return True
 
-def update_parameter(param_structure: dict, parameter_name: str, new_value: any) -> dict:
+def update_parameter(params: ParameterInfo, parameter_name: str, new_value: any) -> ParameterInfo:
     """
-    Update any parameter in the structure
+    Update any parameter
     
     Args:
-        param_structure: Current parameter structure
+        params: Current parameters
         parameter_name: Parameter name to update
         new_value: New value to set
     
     Returns:
-        Updated parameter structure
+        Updated parameters
     """
-    if parameter_name not in param_structure:
+    if parameter_name not in ParameterInfo._fields:
         raise ValueError(f"Parameter '{parameter_name}' not found in structure")
     
     # Validate parameter value
     validate_parameter_value(parameter_name, new_value)
     
     # Update the parameter
-    param_structure[parameter_name]["value"] = new_value
+    params = params._replace(**{parameter_name: new_value})
     
     print(f"   ✅ Updated {parameter_name}: {new_value}")
     
-    return param_structure
+    return params
 
-def update_multiple_parameters(param_structure: dict, updates: dict) -> dict:
+def update_multiple_parameters(params: ParameterInfo, updates: dict) -> ParameterInfo:
     """
     Update multiple parameters at once
     
+    Every update is validated before any is applied.
+    
     Args:
-        param_structure: Current parameter structure
+        params: Current parameters
         updates: Dictionary of {parameter_name: new_value}
     
     Returns:
-        Updated parameter structure
+        Updated parameters
     """
+    validate = validate_parameter_value
     for param_name, new_value in updates.items():
-        param_structure = update_parameter(param_structure, param_name, new_value)
+        if param_name not in ParameterInfo._fields:
+            raise ValueError(f"Parameter '{param_name}' not found in structure")
+        validate(param_name, new_value)
+    
+    params = params._replace(**updates)
     
-    return param_structure
+    for param_name, new_value in updates.items():
+        print(f"   ✅ Updated {param_name}: {new_value}")
+    
+    return params
 
-def serialize_parameter_structure(param_structure: dict) -> bytes:
-    """Convert parameter structure to bytes according to spec 6-2 DATA format"""
+def serialize_parameter_structure(params: ParameterInfo) -> bytes:
+    """Convert parameters to bytes according to spec 6-2 DATA format"""
     try:
-        # Build parameter data according to spec 6-2 (19 bytes total)
-        data = b''
-        
-        # SensorID (2 bytes) - 0x0121 fixed for illuminance sensor
-        sensor_id = param_structure["sensor_id"]["value"]
-        data += struct.pack('<H', sensor_id)
-        
-        # TimeZone (1 byte)
-        data += struct.pack('<B', param_structure["timezone"]["value"])
-        
-        # BLE Mode (1 byte)
-        data += struct.pack('<B', param_structure["ble_mode"]["value"])
-        
-        # Tx Power (1 byte)
-        data += struct.pack('<B', param_structure["tx_power"]["value"])
-        
-        # Advertise Interval (2 bytes, little endian)
-        data += struct.pack('<H', param_structure["advertise_interval"]["value"])
-        
-        # Sensor Uplink Interval (4 bytes, little endian)
-        data += struct.pack('<L', param_structure["sensor_uplink_interval"]["value"])
-        
-        # Sensor Read Mode (1 byte)
-        data += struct.pack('<B', param_structure["sensor_read_mode"]["value"])
-        
-        # Sampling (1 byte)
-        data += struct.pack('<B', param_structure["sampling"]["value"])
-        
-        # HysteresisHigh (4 bytes, little endian, IEEE 754 Float)
-        data += struct.pack('<f', param_structure["hysteresis_high"]["value"])
-        
-        # HysteresisLow (4 bytes, little endian, IEEE 754 Float)
-        data += struct.pack('<f', param_structure["hysteresis_low"]["value"])
+        # Build parameter data according to spec 6-2 in one pack
+        data = _PARAM_SET.pack(
+            params.sensor_id,  # 0x0121 fixed for illuminance sensor
+            params.timezone,
+            params.ble_mode,
+            params.tx_power,
+            params.advertise_interval,
+            params.sensor_uplink_interval,
+            params.sensor_read_mode,
+            params.sampling,
+            params.hysteresis_high,
+            params.hysteresis_low
+        )
         
         print(f"   📊 Serialized parameter data: {data.hex(' ').upper()}")
         print(f"   📊 Data length: {len(data)} bytes (spec 6-2 format)")
@@ -354,21 +254,14 @@ def parse_downlink_response(data: bytes) -> dict:
         if len(data) < 20:
             return {"error": "Response too short"}
         
-        protocol_version = data[0]
-        packet_type = data[1]
-        unix_time = struct.unpack('<L', data[2:6])[0]
-        device_id = struct.unpack('<Q', data[6:14])[0]
-        sensor_id = struct.unpack('<H', data[14:16])[0]
-        order = struct.unpack('<H', data[16:18])[0]
-        cmd = data[18]
-        result = data[19]
+        (protocol_version, packet_type, unix_time, device_id,
+         sensor_id, order, cmd, result) = _RESP_HDR.unpack_from(data, 0)
         
         return {
             "raw_hex": data.hex(' ').upper(),
             "protocol_version": f"0x{protocol_version:02X}",
             "type": f"0x{packet_type:02X}",
             "unix_time": unix_time,
-            "timestamp": datetime.fromtimestamp(unix_time).isoformat(),
             "device_id": f"0x{device_id:016X}",
             "sensor_id": f"0x{sensor_id:04X}",
             "order": order,
@@ -384,90 +277,89 @@ def parse_downlink_response(data: bytes) -> dict:
 
 def get_result_description(result: int) -> str:
     """Get result code description"""
-    descriptions = {
-        0x00: "Success",
-        0x01: "Invalid Sensor ID",
-        0x02: "Unsupported CMD",
-        0x03: "Parameter out of range",
-        0x04: "Connection failed",
-        0x05: "Timeout",
-        0x07: "Device not found",
-        0x08: "Router busy",
-        0x09: "Module busy"
-    }
-    return descriptions.get(result, f"Unknown(0x{result:02X})")
+    if 0 <= result < len(_RESULT_DESC) and _RESULT_DESC[result]:
+        return _RESULT_DESC[result]
+    return f"Unknown(0x{result:02X})"
 
 def get_cmd_name(cmd: int) -> str:
     """Get command name"""
-    commands = {
-        0x00: "IMMEDIATE_UPLINK",
-        0x05: "SET_PARAMETER",
-        0x06: "GET_PARAMETER",
-        0x07: "SENSOR_DFU",
-        0x08: "DEVICE_RESET",
-        0x0D: "GET_DEVICE_SETTING"
-    }
-    return commands.get(cmd, f"UNKNOWN(0x{cmd:02X})")
+    if 0 <= cmd < len(_CMD_NAMES) and _CMD_NAMES[cmd]:
+        return _CMD_NAMES[cmd]
+    return f"UNKNOWN(0x{cmd:02X})"
+
+def write_lines(lines: list):
+    """Write a block of output lines with a single stdout write"""
+    sys.stdout.write("\n".join(lines) + "\n")
 
-def on_data_received(data: bytes):
+def on_data_received(data: bytes, state: SettingTestState):
     """Callback for received data - handles both GET and SET phases"""
-    global current_parameters, setting_response, get_response_received, set_response_received, test_failed
-    
-    if len(data) < 2:
-        return
+    if len(data) < _ROUTE.size + 16:
+        return  # Too short to be an uplink or a downlink response
     
     packet_type = data[1]
+    uplink_sensor_id, cmd = _ROUTE.unpack_from(data, 16)
     
     if packet_type == 0x01:  # Downlink response
+        if cmd != 0x0D and cmd != 0x05:
+            return  # Not a response to this test's requests
+        
         response = parse_downlink_response(data)
-        cmd = data[18] if len(data) > 18 else 0
         
         if cmd == 0x0D:  # GET_DEVICE_SETTING response
-            print(f"\n✅ STEP 2: GET PARAMETER DOWNLINK RESPONSE")
-            print(f"   HEX: {response.get('raw_hex', 'Unknown')}")
-            print(f"   Result: {response.get('result_desc', 'Unknown')}")
+            lines = [
+                "\n✅ STEP 2: GET PARAMETER DOWNLINK RESPONSE",
+                f"   HEX: {response.get('raw_hex', 'Unknown')}",
+                f"   Result: {response.get('result_desc', 'Unknown')}"
+            ]
             
             if response.get('success', False):
-                print(f"   ✅ Parameter acquisition successful!")
-                print(f"   ⏳ Waiting for parameter information uplink...")
+                lines.append("   ✅ Parameter acquisition successful!")
+                lines.append("   ⏳ Waiting for parameter information uplink...")
+                write_lines(lines)
             else:
-                print(f"   ❌ Parameter acquisition failed: {response.get('result_desc', 'Unknown')}")
-                test_failed = True
+                lines.append(f"   ❌ Parameter acquisition failed: {response.get('result_desc', 'Unknown')}")
+                write_lines(lines)
+                state.test_failed = True
+                state.get_response_received.set()  # Wake main; test_failed is checked first
         
         elif cmd == 0x05:  # SET_PARAMETER response
-            print(f"\n✅ STEP 9: SET PARAMETER DOWNLINK RESPONSE")
-            print(f"   HEX: {response.get('raw_hex', 'Unknown')}")
-            print(f"   Result: {response.get('result_desc', 'Unknown')}")
+            lines = [
+                "\n✅ STEP 9: SET PARAMETER DOWNLINK RESPONSE",
+                f"   HEX: {response.get('raw_hex', 'Unknown')}",
+                f"   Result: {response.get('result_desc', 'Unknown')}"
+            ]
             
-            setting_response = response
-            set_response_received = True
+            state.setting_response = response
             
             if not response.get('success', False):
-                print(f"   ❌ Parameter setting failed: {response.get('result_desc', 'Unknown')}")
-                test_failed = True
+                lines.append(f"   ❌ Parameter setting failed: {response.get('result_desc', 'Unknown')}")
+                state.test_failed = True
+            write_lines(lines)
+            state.set_response_received.set()
         
     elif packet_type == 0x00:  # Uplink notification
-        if not get_response_received:  # Still in GET phase
-            sensor_id = struct.unpack('<H', data[16:18])[0] if len(data) >= 18 else 0
-            
-            if sensor_id == 0x0000:  # Parameter information uplink
-                print(f"\n🎯 STEP 4: PARAMETER INFORMATION UPLINK")
-                print(f"   Raw HEX: {data.hex(' ').upper()}")
+        if not state.get_response_received.is_set():  # Still in GET phase
+            if uplink_sensor_id == 0x0000:  # Parameter information uplink
+                lines = [
+                    "\n🎯 STEP 4: PARAMETER INFORMATION UPLINK",
+                    f"   Raw HEX: {data.hex(' ').upper()}"
+                ]
                 
-                current_parameters = parse_parameter_information(data)
-                get_response_received = True
+                state.current_parameters = parse_parameter_information(data)
                 
-                if "error" in current_parameters:
-                    print(f"   ❌ Parameter parsing failed: {current_parameters['error']}")
-                    test_failed = True
+                if isinstance(state.current_parameters, dict):  # Error result
+                    lines.append(f"   ❌ Parameter parsing failed: {state.current_parameters['error']}")
+                    state.test_failed = True
                 else:
-                    print(f"   ✅ Parameter information received and parsed")
+                    lines.append("   ✅ Parameter information received and parsed")
+                write_lines(lines)
+                state.get_response_received.set()
             else:
-                print(f"📦 Other sensor uplink: 0x{sensor_id:04X} (ignoring)")
+                print(f"📦 Other sensor uplink: 0x{uplink_sensor_id:04X} (ignoring)")
 
 def main():
     """Main parameter setting test function"""
-    global get_response_received, set_response_received, test_failed
+    state = SettingTestState()
     
     # Initialize change tracking
     change_info = {}
@@ -497,7 +389,7 @@ def main():
     
     try:
         with AsyncSerialMonitor(port=port, baudrate=baudrate) as monitor:
-            monitor.set_data_callback(on_data_received)
+            monitor.set_data_callback(lambda data: on_data_received(data, state))
             monitor.start_monitoring()
             
             # PHASE 1: GET CURRENT PARAMETERS (Steps 1-4)
@@ -516,15 +408,13 @@ def main():
                 return False
             
             # Wait for GET phase completion
-            start_time = time.time()
-            while not get_response_received and not test_failed and (time.time() - start_time) < 30:
-                time.sleep(0.1)
+            state.get_response_received.wait(timeout=30)
             
-            if test_failed:
+            if state.test_failed:
                 print(f"\n❌ GET phase failed")
                 return False
             
-            if not get_response_received or not current_parameters:
+            if not state.get_response_received.is_set() or state.current_parameters is None:
                 print(f"\n❌ Failed to get current parameters")
                 return False
             
@@ -535,20 +425,19 @@ def main():
             print(f"=" * 50)
             
             print(f"\n📊 STEP 5-6: Current parameter values:")
-            for param_name, param_info in current_parameters.items():
-                if isinstance(param_info, dict) and "value" in param_info:
-                    print(f"   {param_name}: {param_info['value']}")
+            for param_name, value in state.current_parameters._asdict().items():
+                print(f"   {param_name}: {value}")
             
             print(f"\n🔄 STEP 7: Modifying parameters...")
             
             try:
                 # Change Sensor Uplink Interval to 10 seconds
                 parameter_name = "sensor_uplink_interval"
-                old_value = current_parameters[parameter_name]["value"]
+                old_value = getattr(state.current_parameters, parameter_name)
                 new_value = 10
                 
                 print(f"   🔄 Changing {parameter_name}: {old_value} → {new_value}")
-                modified_params = update_parameter(current_parameters, parameter_name, new_value)
+                modified_params = update_parameter(state.current_parameters, parameter_name, new_value)
                 
                 # Store change info for final log
                 change_info = {
@@ -585,19 +474,18 @@ def main():
                 return False
             
             # Wait for SET phase completion
-            start_time = time.time()
-            while not set_response_received and not test_failed and (time.time() - start_time) < 30:
-                time.sleep(0.1)
+            state.set_response_received.wait(timeout=30)
             
             # Final results
             print(f"\n" + "=" * 70)
             print(f"📊 FINAL TEST RESULTS")
             print(f"=" * 70)
             
-            if test_failed:
+            if state.test_failed:
                 print(f"\n❌ TEST FAILED")
                 return False
             
+            setting_response = state.setting_response
             if setting_response and setting_response.get('success', False):
                 print(f"\n✅ PARAMETER SETTING SUCCESSFUL!")
                 print(f"   Command: {setting_response.get('cmd_name', 'Unknown')}")
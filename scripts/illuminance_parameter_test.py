@@ -9,19 +9,110 @@ import time
 import signal
 import struct
 import sys
+import threading
+from bisect import bisect_right
 from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Union
 from async_serial_monitor import AsyncSerialMonitor
+from bravejig_rx import classify, PACKET_TYPE_UPLINK, PACKET_TYPE_DOWNLINK_RESPONSE, SENSOR_ID_ILLUMINANCE
+
+# Downlink request header: Ver, Type, DataLen, UnixTime, DeviceID, SensorID, CMD, Order
+_REQ_HDR = struct.Struct('<BBHLQHBH')
+# Downlink response: Ver, Type, UnixTime, DeviceID, SensorID, Order, CMD, Result
+_RESP_HDR = struct.Struct('<BBLQHHBB')
+# Parameter acquisition request data (constant, 6 bytes):
+# SensorID 0x0000 (end device main unit), CMD 0x0D (device information
+# acquisition), Sequence No 0xFFFF (fixed), DATA 0x00 (parameter information)
+_PARAM_BODY = struct.pack('<HBHB', 0x0000, 0x0D, 0xFFFF, 0x00)
+
+_U16 = struct.Struct('<H')
+_U64 = struct.Struct('<Q')
+
+# Parameter information sensor data (spec 5-2, 28 bytes): field names and
+# struct codes in packet order
+_PARAM_FIELDS = (
+    ("param_sensor_id", "H"),
+    ("sequence_no", "H"),
+    ("connected_sensor_id", "H"),
+    ("fw_version", "3s"),
+    ("timezone", "B"),
+    ("ble_mode", "B"),
+    ("tx_power", "B"),
+    ("advertise_interval", "H"),
+    ("sensor_uplink_interval", "L"),
+    ("sensor_read_mode", "B"),
+    ("sampling", "B"),
+    ("hysteresis_high", "f"),
+    ("hysteresis_low", "f")
+)
+_PARAM_NAMES = tuple(name for name, _ in _PARAM_FIELDS)
+# _PARAM_PREFIXES[n] unpacks the first n fields, so a truncated uplink still
+# yields every field that fits; the last entry covers the full record
+_PARAM_PREFIXES = tuple(struct.Struct('<' + ''.join(code for _, code in _PARAM_FIELDS[:n]))
+                        for n in range(len(_PARAM_FIELDS) + 1))
+_PARAM_PREFIX_SIZES = tuple(prefix.size for prefix in _PARAM_PREFIXES)
+
+# Result code descriptions, indexed by result code (None = undefined)
+_RESULT_DESC = (
+    "Success",                 # 0x00
+    "Invalid Sensor ID",       # 0x01
+    "Unsupported CMD",         # 0x02
+    "Parameter out of range",  # 0x03
+    "Connection failed",       # 0x04
+    "Timeout",                 # 0x05
+    None,                      # 0x06
+    "Device not found",        # 0x07
+    "Router busy",             # 0x08
+    "Module busy",             # 0x09
+)
+
+# Command names, indexed by CMD code (None = unknown)
+_CMD_NAMES = (
+    "IMMEDIATE_UPLINK",  # 0x00
+    None, None, None, None,
+    "SET_PARAMETER",     # 0x05
+    "GET_PARAMETER",     # 0x06
+    "SENSOR_DFU",        # 0x07
+    "DEVICE_RESET",      # 0x08
+)
+
+@lru_cache(maxsize=1024)
+def _format_time(unix_time: int) -> str:
+    """Format a packet's UnixTime as HH:MM:SS (packets within a second share it)"""
+    return datetime.fromtimestamp(unix_time).strftime('%H:%M:%S')
+
+class DownlinkResponse(NamedTuple):
+    """Downlink response (Type: 0x01) header fields as received"""
+    protocol_version: int
+    packet_type: int
+    unix_time: int
+    device_id: int
+    sensor_id: int
+    order: int
+    cmd: int
+    result: int
+
+    @property
+    def success(self) -> bool:
+        return self.result == 0x00
 
 # Global flag for graceful shutdown
 test_running = True
 downlink_responses = []
 uplink_notifications = []
+# Set once any downlink response reports success
+response_succeeded = False
+
+# Wakes the main loop on Ctrl+C or a downlink response instead of polling
+_wakeup = threading.Event()
 
 def signal_handler(signum, frame):
     """Handle Ctrl+C gracefully"""
     global test_running
     print("\n🛑 Stopping parameter acquisition test...")
     test_running = False
+    _wakeup.set()
 
 def create_illuminance_parameter_request(device_id: int) -> bytes:
     """Create illuminance sensor parameter acquisition downlink request
@@ -40,63 +131,48 @@ def create_illuminance_parameter_request(device_id: int) -> bytes:
     cmd = 0x06  # GET_PARAMETER command
     order = 0x0000
     
-    # Illuminance-specific parameter request data (6 bytes)
-    param_data = struct.pack('<H', 0x0000)  # SensorID: End device main unit
-    param_data += struct.pack('<B', 0x0D)   # CMD: Device information acquisition
-    param_data += struct.pack('<H', 0xFFFF) # Sequence No: Fixed
-    param_data += struct.pack('<B', 0x00)   # DATA: Parameter info acquisition
-    
-    data_length = len(param_data)
-    
     # Build complete downlink request packet
-    packet = struct.pack('<BB', protocol_version, packet_type)
-    packet += struct.pack('<H', data_length)
-    packet += struct.pack('<L', unix_time)
-    packet += struct.pack('<Q', device_id)
-    packet += struct.pack('<H', sensor_id)
-    packet += struct.pack('<B', cmd)
-    packet += struct.pack('<H', order)
-    packet += param_data
-    
-    return packet
+    return _REQ_HDR.pack(protocol_version, packet_type, len(_PARAM_BODY), unix_time,
+                         device_id, sensor_id, cmd, order) + _PARAM_BODY
 
-def parse_downlink_response(data: bytes) -> dict:
-    """Parse downlink response (Type: 0x01)"""
+def parse_downlink_response(data: bytes) -> Union[DownlinkResponse, dict]:
+    """Parse downlink response (Type: 0x01)
+    
+    Returns the raw header fields; format_response() builds the display
+    values when they are printed. Error dicts keep the packet bytes unformatted
+    under "raw" (the callback prints every response's hex dump already).
+    """
     try:
-        if len(data) < 20:
-            return {"error": "Response too short", "raw": data.hex(' ').upper()}
-        
-        protocol_version = data[0]
-        packet_type = data[1]
-        unix_time = struct.unpack('<L', data[2:6])[0]
-        device_id = struct.unpack('<Q', data[6:14])[0]
-        sensor_id = struct.unpack('<H', data[14:16])[0]
-        order = struct.unpack('<H', data[16:18])[0]
-        cmd = data[18]
-        result = data[19]
+        if len(data) < _RESP_HDR.size:
+            return {"error": "Response too short", "raw": bytes(data)}
         
-        result_desc = get_result_description(result)
-        
-        return {
-            "protocol_version": f"0x{protocol_version:02X}",
-            "type": f"0x{packet_type:02X}",
-            "type_name": "DOWNLINK_RESPONSE",
-            "unix_time": unix_time,
-            "timestamp": datetime.fromtimestamp(unix_time).strftime('%H:%M:%S'),
-            "device_id": f"0x{device_id:016X}",
-            "sensor_id": f"0x{sensor_id:04X}",
-            "sensor_name": "Illuminance" if sensor_id == 0x0121 else f"Other(0x{sensor_id:04X})",
-            "order": order,
-            "cmd": f"0x{cmd:02X}",
-            "cmd_name": get_cmd_name(cmd),
-            "result": f"0x{result:02X}",
-            "result_desc": result_desc,
-            "success": result == 0x00,
-            "raw": data.hex(' ').upper()
-        }
+        return DownlinkResponse._make(_RESP_HDR.unpack_from(data))
         
     except Exception as e:
-        return {"error": f"Parse error: {e}", "raw": data.hex(' ').upper()}
+        return {"error": f"Parse error: {e}", "raw": bytes(data)}
+
+def format_response(response: Union[DownlinkResponse, dict]) -> dict:
+    """Build display values for a parsed downlink response (error dicts pass through)"""
+    if not isinstance(response, DownlinkResponse):
+        return response
+    
+    sensor_id = response.sensor_id
+    return {
+        "protocol_version": f"0x{response.protocol_version:02X}",
+        "type": f"0x{response.packet_type:02X}",
+        "type_name": "DOWNLINK_RESPONSE",
+        "unix_time": response.unix_time,
+        "timestamp": _format_time(response.unix_time),
+        "device_id": f"0x{response.device_id:016X}",
+        "sensor_id": f"0x{sensor_id:04X}",
+        "sensor_name": "Illuminance" if sensor_id == 0x0121 else f"Other(0x{sensor_id:04X})",
+        "order": response.order,
+        "cmd": f"0x{response.cmd:02X}",
+        "cmd_name": get_cmd_name(response.cmd),
+        "result": f"0x{response.result:02X}",
+        "result_desc": get_result_description(response.result),
+        "success": response.success
+    }
 
 def parse_parameter_uplink(data: bytes) -> dict:
     """Parse parameter information uplink (based on spec 5-2)"""
@@ -105,96 +181,25 @@ def parse_parameter_uplink(data: bytes) -> dict:
             return {"error": "Uplink too short"}
             
         # Common header
-        sensor_id = struct.unpack('<H', data[16:18])[0]
+        sensor_id = _U16.unpack_from(data, 16)[0]
         if sensor_id != 0x0121:
             return {"error": "Not illuminance sensor"}
             
         # Sensor data starts at index 21
-        sensor_data = data[21:]
-        if len(sensor_data) < 10:
+        available = len(data) - 21
+        if available < 10:
             return {"error": "Insufficient sensor data"}
             
-        # Parse based on 5-2 パラメータ情報 specification
-        result = {}
-        offset = 0
+        # Parse based on 5-2 パラメータ情報 specification: one unpack of as
+        # many whole fields as the sensor data holds (all 13 when complete)
+        count = bisect_right(_PARAM_PREFIX_SIZES, available) - 1
+        result = dict(zip(_PARAM_NAMES, _PARAM_PREFIXES[count].unpack_from(data, 21)))
         
-        # SensorID (2 bytes)
-        if offset + 2 <= len(sensor_data):
-            param_sensor_id = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result["param_sensor_id"] = f"0x{param_sensor_id:04X}"
-            offset += 2
-            
-        # Sequence No (2 bytes)
-        if offset + 2 <= len(sensor_data):
-            sequence_no = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result["sequence_no"] = sequence_no
-            offset += 2
-            
-        # Sensor Data section
-        if offset + 2 <= len(sensor_data):
-            connected_sensor_id = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result["connected_sensor_id"] = f"0x{connected_sensor_id:04X}"
-            offset += 2
-            
-        # FW Version (3 bytes)
-        if offset + 3 <= len(sensor_data):
-            fw_version = sensor_data[offset:offset+3]
-            result["fw_version"] = f"{fw_version[0]}.{fw_version[1]}.{fw_version[2]}"
-            offset += 3
-            
-        # TimeZone (1 byte)
-        if offset + 1 <= len(sensor_data):
-            timezone = sensor_data[offset]
-            result["timezone"] = timezone
-            offset += 1
-            
-        # BLE Mode (1 byte)
-        if offset + 1 <= len(sensor_data):
-            ble_mode = sensor_data[offset]
-            result["ble_mode"] = ble_mode
-            offset += 1
-            
-        # Tx Power (1 byte)
-        if offset + 1 <= len(sensor_data):
-            tx_power = sensor_data[offset]
-            result["tx_power"] = tx_power
-            offset += 1
-            
-        # Advertise Interval (2 bytes, little endian)
-        if offset + 2 <= len(sensor_data):
-            adv_interval = struct.unpack('<H', sensor_data[offset:offset+2])[0]
-            result["advertise_interval"] = adv_interval
-            offset += 2
-            
-        # Sensor Uplink Interval (4 bytes, little endian)
-        if offset + 4 <= len(sensor_data):
-            uplink_interval = struct.unpack('<L', sensor_data[offset:offset+4])[0]
-            result["sensor_uplink_interval"] = uplink_interval
-            offset += 4
-            
-        # Sensor Read Mode (1 byte)
-        if offset + 1 <= len(sensor_data):
-            read_mode = sensor_data[offset]
-            result["sensor_read_mode"] = read_mode
-            offset += 1
-            
-        # Sampling (1 byte)
-        if offset + 1 <= len(sensor_data):
-            sampling = sensor_data[offset]
-            result["sampling"] = sampling
-            offset += 1
-            
-        # HysteresisHigh (4 bytes, little endian)
-        if offset + 4 <= len(sensor_data):
-            hysteresis_high = struct.unpack('<f', sensor_data[offset:offset+4])[0]
-            result["hysteresis_high"] = hysteresis_high
-            offset += 4
-            
-        # HysteresisLow (4 bytes, little endian)
-        if offset + 4 <= len(sensor_data):
-            hysteresis_low = struct.unpack('<f', sensor_data[offset:offset+4])[0]
-            result["hysteresis_low"] = hysteresis_low
-            offset += 4
+        # The first 10 bytes always include the IDs and FW version
+        fw_version = result["fw_version"]
+        result["param_sensor_id"] = f"0x{result['param_sensor_id']:04X}"
+        result["connected_sensor_id"] = f"0x{result['connected_sensor_id']:04X}"
+        result["fw_version"] = f"{fw_version[0]}.{fw_version[1]}.{fw_version[2]}"
             
         return result
         
@@ -203,76 +208,88 @@ def parse_parameter_uplink(data: bytes) -> dict:
 
 def get_result_description(result: int) -> str:
     """Get result code description"""
-    descriptions = {
-        0x00: "Success",
-        0x01: "Invalid Sensor ID",
-        0x02: "Unsupported CMD",
-        0x03: "Parameter out of range",
-        0x04: "Connection failed", 
-        0x05: "Timeout",
-        0x07: "Device not found",
-        0x08: "Router busy",
-        0x09: "Module busy"
-    }
-    return descriptions.get(result, f"Unknown result (0x{result:02X})")
+    if 0 <= result < len(_RESULT_DESC) and _RESULT_DESC[result]:
+        return _RESULT_DESC[result]
+    return f"Unknown result (0x{result:02X})"
 
 def get_cmd_name(cmd: int) -> str:
     """Get command name"""
-    commands = {
-        0x00: "IMMEDIATE_UPLINK",
-        0x05: "SET_PARAMETER",
-        0x06: "GET_PARAMETER",
-        0x07: "SENSOR_DFU",
-        0x08: "DEVICE_RESET"
-    }
-    return commands.get(cmd, f"UNKNOWN(0x{cmd:02X})")
+    if 0 <= cmd < len(_CMD_NAMES) and _CMD_NAMES[cmd]:
+        return _CMD_NAMES[cmd]
+    return f"UNKNOWN(0x{cmd:02X})"
+
+def write_lines(lines: list):
+    """Write a block of output lines with a single stdout write"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+def _handle_downlink_response(data: bytes, sensor_id):
+    """Print and record a downlink response"""
+    global response_succeeded
+    response = parse_downlink_response(data)
+    downlink_responses.append(response)
+    if isinstance(response, DownlinkResponse) and response.success:
+        response_succeeded = True
+    
+    details = format_response(response)
+    write_lines([
+        f"\n📥 Downlink Response: {data.hex(' ').upper()}",
+        f"✅ Downlink Response Details:",
+        f"   Device: {details.get('device_id', 'Unknown')}",
+        f"   Sensor: {details.get('sensor_name', 'Unknown')}",
+        f"   Command: {details.get('cmd_name', 'Unknown')}",
+        f"   Result: {details.get('result_desc', 'Unknown')}",
+        f"   Time: {details.get('timestamp', 'Unknown')}"
+    ])
+    _wakeup.set()
+
+def _handle_illuminance_uplink(data: bytes, sensor_id):
+    """Illuminance uplink - check whether it carries parameter information"""
+    device_id = _U64.unpack_from(data, 8)[0]
+    lines = [f"\n📦 Illuminance Uplink: Device 0x{device_id:016X}"]
+    
+    # Try to parse as parameter information
+    param_info = parse_parameter_uplink(data)
+    if "error" not in param_info:
+        lines += [
+            f"🔍 Parameter Information Detected:",
+            f"   FW Version: {param_info.get('fw_version', 'Unknown')}",
+            f"   Uplink Interval: {param_info.get('sensor_uplink_interval', 'Unknown')} seconds",
+            f"   Advertise Interval: {param_info.get('advertise_interval', 'Unknown')}",
+            f"   Tx Power: {param_info.get('tx_power', 'Unknown')}",
+            f"   Hysteresis High: {param_info.get('hysteresis_high', 'Unknown')} lux",
+            f"   Hysteresis Low: {param_info.get('hysteresis_low', 'Unknown')} lux"
+        ]
+        uplink_notifications.append(param_info)
+    else:
+        lines.append(f"📊 Regular sensor data (not parameter info)")
+    write_lines(lines)
+
+def _handle_other_uplink(data: bytes, sensor_id):
+    """Uplink from another sensor (ignored if too short to carry a sensor ID)"""
+    if sensor_id is not None:
+        print(f"📦 Other sensor uplink: 0x{sensor_id:04X}")
+
+def _handle_other_packet(data: bytes, sensor_id):
+    """Packet type this test does not handle"""
+    print(f"📦 Other packet type: 0x{data[1]:02X}")
+
+# Handlers by (packet type, sensor ID); a None sensor ID entry covers every
+# other sensor of that packet type
+_HANDLERS = {
+    (PACKET_TYPE_DOWNLINK_RESPONSE, None): _handle_downlink_response,
+    (PACKET_TYPE_UPLINK, SENSOR_ID_ILLUMINANCE): _handle_illuminance_uplink,
+    (PACKET_TYPE_UPLINK, None): _handle_other_uplink
+}
 
 def on_data_received(data: bytes):
     """Callback for received data - distinguish between downlink responses and uplink notifications"""
-    global downlink_responses, uplink_notifications
-    
-    if len(data) < 2:
+    packet_type, sensor_id = classify(data)
+    if packet_type is None:
         return
-        
-    packet_type = data[1]
     
-    if packet_type == 0x01:  # Downlink response
-        print(f"\n📥 Downlink Response: {data.hex(' ').upper()}")
-        response = parse_downlink_response(data)
-        downlink_responses.append(response)
-        
-        print(f"✅ Downlink Response Details:")
-        print(f"   Device: {response.get('device_id', 'Unknown')}")
-        print(f"   Sensor: {response.get('sensor_name', 'Unknown')}")
-        print(f"   Command: {response.get('cmd_name', 'Unknown')}")
-        print(f"   Result: {response.get('result_desc', 'Unknown')}")
-        print(f"   Time: {response.get('timestamp', 'Unknown')}")
-        
-    elif packet_type == 0x00:  # Uplink notification
-        # Check if this is illuminance sensor and might be parameter data
-        if len(data) >= 18:
-            sensor_id = struct.unpack('<H', data[16:18])[0]
-            if sensor_id == 0x0121:  # Illuminance sensor
-                device_id = struct.unpack('<Q', data[8:16])[0]
-                print(f"\n📦 Illuminance Uplink: Device 0x{device_id:016X}")
-                
-                # Try to parse as parameter information
-                param_info = parse_parameter_uplink(data)
-                if "error" not in param_info:
-                    print(f"🔍 Parameter Information Detected:")
-                    print(f"   FW Version: {param_info.get('fw_version', 'Unknown')}")
-                    print(f"   Uplink Interval: {param_info.get('sensor_uplink_interval', 'Unknown')} seconds")
-                    print(f"   Advertise Interval: {param_info.get('advertise_interval', 'Unknown')}")
-                    print(f"   Tx Power: {param_info.get('tx_power', 'Unknown')}")
-                    print(f"   Hysteresis High: {param_info.get('hysteresis_high', 'Unknown')} lux")
-                    print(f"   Hysteresis Low: {param_info.get('hysteresis_low', 'Unknown')} lux")
-                    uplink_notifications.append(param_info)
-                else:
-                    print(f"📊 Regular sensor data (not parameter info)")
-            else:
-                print(f"📦 Other sensor uplink: 0x{sensor_id:04X}")
-    else:
-        print(f"📦 Other packet type: 0x{packet_type:02X}")
+    handler = (_HANDLERS.get((packet_type, sensor_id))
+               or _HANDLERS.get((packet_type, None), _handle_other_packet))
+    handler(data, sensor_id)
 
 def on_error(error: Exception):
     """Callback for errors"""
@@ -330,16 +347,20 @@ def main():
             print(f"   Duration: 90 seconds")
             
             # Monitor for responses (90 seconds to catch 60-second uplink cycle)
-            start_time = time.time()
+            deadline = time.monotonic() + 90
             response_received = False
             
-            while test_running and monitor.is_monitoring and (time.time() - start_time) < 90:
+            while test_running and monitor.is_monitoring:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _wakeup.wait(timeout=remaining)
+                _wakeup.clear()
+                
                 # Check if we received a downlink response
                 if downlink_responses and not response_received:
                     response_received = True
                     print(f"\n✅ Downlink response received! Continuing to monitor for parameter uplink...")
-                
-                time.sleep(0.1)
             
             # Summary
             print(f"\n📊 Test Summary:")
@@ -348,14 +369,19 @@ def main():
             
             if downlink_responses:
                 print(f"\n📋 Downlink Response Details:")
-                for i, response in enumerate(downlink_responses):
-                    success = "✅ Success" if response.get('success', False) else "❌ Failed"
-                    print(f"   {i+1}. {response.get('sensor_name', 'Unknown')} - {response.get('result_desc', 'Unknown')} ({success})")
+                for i, response in enumerate(downlink_responses, 1):
+                    details = format_response(response)
+                    name = details.get('sensor_name', 'Unknown')
+                    desc = details.get('result_desc', 'Unknown')
+                    success = "✅ Success" if details.get('success', False) else "❌ Failed"
+                    print(f"   {i}. {name} - {desc} ({success})")
             
             if uplink_notifications:
                 print(f"\n📋 Parameter Information:")
-                for i, param in enumerate(uplink_notifications):
-                    print(f"   {i+1}. FW: {param.get('fw_version', 'Unknown')}, Interval: {param.get('sensor_uplink_interval', 'Unknown')}s")
+                for i, param in enumerate(uplink_notifications, 1):
+                    fw_version = param.get('fw_version', 'Unknown')
+                    interval = param.get('sensor_uplink_interval', 'Unknown')
+                    print(f"   {i}. FW: {fw_version}, Interval: {interval}s")
             
             # Communication stats
             stats = monitor.statistics
@@ -364,8 +390,7 @@ def main():
             print(f"   Bytes received: {stats['bytes_received']}")
             
             # Test result
-            success = len(downlink_responses) > 0 and any(r.get('success', False) for r in downlink_responses)
-            return success
+            return response_succeeded
             
     except Exception as e:
         print(f"❌ Parameter acquisition test failed: {e}")
@@ -7,105 +7,155 @@ has changed to approximately 10 seconds.
 """
 
 import time
+import signal
 import struct
 import sys
+import threading
+from array import array
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import sub
 from async_serial_monitor import AsyncSerialMonitor
+from bravejig_rx import classify, PACKET_TYPE_UPLINK, SENSOR_ID_ILLUMINANCE
 
-# Global storage for illuminance uplinks
+_F32 = struct.Struct('<f')
+# Uplink header from offset 4: UnixTime, DeviceID, SensorID, RSSI (signed dBm)
+_UPLINK_HDR = struct.Struct('<LQHb')
+
+@lru_cache(maxsize=1024)
+def _format_time(unix_time: int) -> str:
+    """Uplink UnixTime as HH:MM:SS, cached per second"""
+    return datetime.fromtimestamp(unix_time).strftime('%H:%M:%S')
+
+# Receive times (time.monotonic()) of illuminance uplinks; the interval
+# statistics only need these
+uplink_timestamps = array('d')
+
+# Keep the full per-uplink details (including the raw hex dump) as well
+VERBOSE = False
 illuminance_uplinks = []
 test_start_time = None
 
-def on_data_received(data: bytes):
-    """Callback for received data - focus on illuminance uplinks"""
-    global illuminance_uplinks, test_start_time
+# Ends the monitoring period early on Ctrl+C
+stop_requested = threading.Event()
+
+def signal_handler(signum, frame):
+    """Handle Ctrl+C gracefully"""
+    print("\n🛑 Stopping interval verification...")
+    stop_requested.set()
+
+def write_lines(lines: list):
+    """Write a block of output lines with a single stdout write"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+def _handle_illuminance_uplink(data: bytes, sensor_id):
+    """Record an illuminance uplink and print its interval from the previous one"""
+    current_time = time.monotonic()
     
-    if len(data) < 18:
-        return
+    # Parse illuminance data
+    unix_time, device_id, _, rssi = _UPLINK_HDR.unpack_from(data, 4)
     
-    packet_type = data[1]
+    # Extract illuminance value (last 4 bytes of sensor data)
+    if len(data) >= 21 + 4:
+        lux_value = _F32.unpack_from(data, len(data) - 4)[0]
+    else:
+        lux_value = 0.0
     
-    if packet_type == 0x00:  # Uplink notification
-        sensor_id = struct.unpack('<H', data[16:18])[0]
+    uplink_info = {
+        "timestamp": current_time,
+        "elapsed_time": current_time - test_start_time,
+        "device_id": f"0x{device_id:016X}",
+        "unix_time": unix_time,
+        "formatted_time": _format_time(unix_time),
+        "rssi": f"{rssi} dBm",
+        "illuminance": f"{lux_value:.2f} lux"
+    }
+    
+    uplink_timestamps.append(current_time)
+    if VERBOSE:
+        uplink_info["raw_hex"] = data.hex(' ').upper()
+        illuminance_uplinks.append(uplink_info)
+    
+    # Calculate interval from previous uplink
+    if len(uplink_timestamps) > 1:
+        interval = current_time - uplink_timestamps[-2]
         
-        if sensor_id == 0x0121:  # Illuminance sensor
-            current_time = time.time()
-            
-            # Parse illuminance data
-            device_id = struct.unpack('<Q', data[8:16])[0]
-            unix_time = struct.unpack('<L', data[4:8])[0]
-            rssi = data[18] if data[18] < 128 else data[18] - 256
-            
-            # Extract illuminance value (last 4 bytes of sensor data)
-            sensor_data = data[21:]
-            if len(sensor_data) >= 4:
-                lux_bytes = sensor_data[-4:]
-                lux_value = struct.unpack('<f', lux_bytes)[0]
-            else:
-                lux_value = 0.0
-            
-            uplink_info = {
-                "timestamp": current_time,
-                "elapsed_time": current_time - test_start_time,
-                "device_id": f"0x{device_id:016X}",
-                "unix_time": unix_time,
-                "formatted_time": datetime.fromtimestamp(unix_time).strftime('%H:%M:%S'),
-                "rssi": f"{rssi} dBm",
-                "illuminance": f"{lux_value:.2f} lux",
-                "raw_hex": data.hex(' ').upper()
-            }
-            
-            illuminance_uplinks.append(uplink_info)
-            
-            # Calculate interval from previous uplink
-            if len(illuminance_uplinks) > 1:
-                prev_uplink = illuminance_uplinks[-2]
-                interval = current_time - prev_uplink["timestamp"]
-                
-                print(f"📦 Illuminance Uplink #{len(illuminance_uplinks)}")
-                print(f"   Time: {uplink_info['formatted_time']}")
-                print(f"   Interval: {interval:.1f} seconds (from previous)")
-                print(f"   Illuminance: {uplink_info['illuminance']}")
-                print(f"   RSSI: {uplink_info['rssi']}")
-                print(f"   Elapsed: {uplink_info['elapsed_time']:.1f}s")
-                print()
-            else:
-                print(f"📦 Illuminance Uplink #1 (first)")
-                print(f"   Time: {uplink_info['formatted_time']}")
-                print(f"   Illuminance: {uplink_info['illuminance']}")
-                print(f"   RSSI: {uplink_info['rssi']}")
-                print(f"   Elapsed: {uplink_info['elapsed_time']:.1f}s")
-                print()
-        else:
-            # Brief info for other sensors
-            print(f"📦 Other sensor: 0x{sensor_id:04X}")
+        write_lines([
+            f"📦 Illuminance Uplink #{len(uplink_timestamps)}",
+            f"   Time: {uplink_info['formatted_time']}",
+            f"   Interval: {interval:.1f} seconds (from previous)",
+            f"   Illuminance: {uplink_info['illuminance']}",
+            f"   RSSI: {uplink_info['rssi']}",
+            f"   Elapsed: {uplink_info['elapsed_time']:.1f}s",
+            ""
+        ])
+    else:
+        write_lines([
+            f"📦 Illuminance Uplink #1 (first)",
+            f"   Time: {uplink_info['formatted_time']}",
+            f"   Illuminance: {uplink_info['illuminance']}",
+            f"   RSSI: {uplink_info['rssi']}",
+            f"   Elapsed: {uplink_info['elapsed_time']:.1f}s",
+            ""
+        ])
 
-def calculate_statistics():
-    """Calculate interval statistics"""
-    if len(illuminance_uplinks) < 2:
-        return None
+def _handle_other_uplink(data: bytes, sensor_id):
+    """Brief info for other sensors"""
+    if sensor_id is not None:
+        print(f"📦 Other sensor: 0x{sensor_id:04X}")
+
+# Handlers by (packet type, sensor ID); a None sensor ID entry covers every
+# other sensor of that packet type
+_HANDLERS = {
+    (PACKET_TYPE_UPLINK, SENSOR_ID_ILLUMINANCE): _handle_illuminance_uplink,
+    (PACKET_TYPE_UPLINK, None): _handle_other_uplink
+}
+
+def on_data_received(data: bytes):
+    """Callback for received data - focus on illuminance uplinks"""
+    packet_type, sensor_id = classify(data)
+    handler = _HANDLERS.get((packet_type, sensor_id)) or _HANDLERS.get((packet_type, None))
+    if handler is not None:
+        handler(data, sensor_id)
+
+def calculate_statistics(keep_intervals: bool = True):
+    """Calculate interval statistics
     
-    intervals = []
-    for i in range(1, len(illuminance_uplinks)):
-        interval = illuminance_uplinks[i]["timestamp"] - illuminance_uplinks[i-1]["timestamp"]
-        intervals.append(interval)
+    The intervals are differenced and reduced by builtins (map, sum, min,
+    max), so the per-sample work runs in C. Without keep_intervals no
+    interval list is built: min and max each take a lazy pass over the
+    differences, and the average follows from the first and last receive
+    times since the intervals sum to their span.
+    """
+    count = len(uplink_timestamps) - 1
+    if count < 1:
+        return None
     
-    avg_interval = sum(intervals) / len(intervals)
-    min_interval = min(intervals)
-    max_interval = max(intervals)
+    if keep_intervals:
+        intervals = list(map(sub, islice(uplink_timestamps, 1, None), uplink_timestamps))
+        return {
+            "count": count,
+            "average": sum(intervals) / count,
+            "minimum": min(intervals),
+            "maximum": max(intervals),
+            "intervals": intervals
+        }
     
     return {
-        "count": len(intervals),
-        "average": avg_interval,
-        "minimum": min_interval,
-        "maximum": max_interval,
-        "intervals": intervals
+        "count": count,
+        "average": (uplink_timestamps[-1] - uplink_timestamps[0]) / count,
+        "minimum": min(map(sub, islice(uplink_timestamps, 1, None), uplink_timestamps)),
+        "maximum": max(map(sub, islice(uplink_timestamps, 1, None), uplink_timestamps))
     }
 
 def main():
     """Main verification function"""
     global test_start_time
     
+    # Setup signal handler
+    signal.signal(signal.SIGINT, signal_handler)
+    
     print("📊 Illuminance Uplink Interval Verification")
     print("=" * 50)
     print("Monitoring illuminance sensor uplink notifications")
@@ -121,12 +171,12 @@ def main():
             monitor.set_data_callback(on_data_received)
             monitor.start_monitoring()
             
-            test_start_time = time.time()
+            test_start_time = time.monotonic()
             print(f"🚀 Starting monitoring at {datetime.now().strftime('%H:%M:%S')}")
             print()
             
-            # Monitor for 60 seconds
-            time.sleep(60)
+            # Monitor for 60 seconds (or until Ctrl+C)
+            stop_requested.wait(timeout=60)
             
             print("⏰ Monitoring completed")
             print()
@@ -138,7 +188,7 @@ def main():
             print("=" * 40)
             
             if stats:
-                print(f"Total illuminance uplinks received: {len(illuminance_uplinks)}")
+                print(f"Total illuminance uplinks received: {len(uplink_timestamps)}")
                 print(f"Intervals measured: {stats['count']}")
                 print(f"Average interval: {stats['average']:.1f} seconds")
                 print(f"Minimum interval: {stats['minimum']:.1f} seconds")
@@ -176,9 +226,9 @@ def main():
                 print("❌ VERIFICATION FAILED")
                 print("   Insufficient data (less than 2 uplinks received)")
                 
-                if len(illuminance_uplinks) == 1:
+                if len(uplink_timestamps) == 1:
                     print("   Only 1 uplink received - need at least 2 to measure interval")
-                elif len(illuminance_uplinks) == 0:
+                elif len(uplink_timestamps) == 0:
                     print("   No illuminance uplinks received - check sensor connection")
                 
                 return False
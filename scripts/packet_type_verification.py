@@ -9,43 +9,85 @@ import time
 import struct
 import json
 import sys
+from collections import deque
 from datetime import datetime
 from async_serial_monitor import AsyncSerialMonitor
 
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+_UPLINK_HDR = struct.Struct('<BBHLQHbH')
+_DOWNLINK_RESP = struct.Struct('<BBLQHHBB')
+_U16 = struct.Struct('<H')
+# Leading SensorID and Sequence No of a spec 5-2 parameter uplink
+_PARAM_MARKERS = struct.Struct('<HH')
+_F32 = struct.Struct('<f')
+
+_PACKET_TYPE_NAMES = {
+    0x00: "UPLINK_NOTIFICATION",
+    0x01: "DOWNLINK_RESPONSE",
+    0x02: "JIG_INFO_RESPONSE"
+}
+
+_RESULT_DESC = {
+    0x00: "Success",
+    0x01: "Invalid Sensor ID",
+    0x02: "Unsupported CMD",
+    0x03: "Parameter out of range",
+    0x04: "Connection failed",
+    0x05: "Timeout",
+    0x07: "Device not found",
+    0x08: "Router busy",
+    0x09: "Module busy"
+}
+
+# Number of analyses kept per packet type; the counts cover every packet
+MAX_STORED_PACKETS = 64
+
+# Analyze and keep every packet, not only the illuminance uplinks and
+# downlink responses shown in the summary
+VERBOSE = False
+
 # Global storage for different packet types
-uplink_notifications = []
-downlink_responses = []
-other_packets = []
+uplink_notifications = deque(maxlen=MAX_STORED_PACKETS)
+downlink_responses = deque(maxlen=MAX_STORED_PACKETS)
+other_packets = deque(maxlen=MAX_STORED_PACKETS)
+uplink_count = 0
+downlink_count = 0
+other_count = 0
+
+# The first illuminance uplink analyses, shown in detail in the summary
+ILLUMINANCE_DETAIL_COUNT = 3
+illuminance_uplinks = []
 
 def analyze_packet_structure(data: bytes) -> dict:
     """Analyze packet structure and determine type"""
     try:
         if len(data) < 21:
-            return {"error": "Packet too short", "raw": data.hex(' ').upper()}
+            return {"error": "Packet too short", "raw": data}
         
         # Parse common header
         protocol_version = data[0]
         packet_type = data[1]
         
         analysis = {
-            "raw_packet": data.hex(' ').upper(),
+            "raw_packet": data,
             "total_length": len(data),
             "protocol_version": f"0x{protocol_version:02X}",
             "packet_type": f"0x{packet_type:02X}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": time.time(),
+            "type_name": get_packet_type_name(packet_type)
         }
         
         if packet_type == 0x00:  # Uplink notification
-            analysis["type_name"] = "UPLINK_NOTIFICATION"
             analysis["structure"] = "ルーター仕様書 5-1-1"
             
             # Parse uplink structure
-            data_length = struct.unpack('<H', data[2:4])[0]
-            unix_time = struct.unpack('<L', data[4:8])[0]
-            device_id = struct.unpack('<Q', data[8:16])[0]
-            sensor_id = struct.unpack('<H', data[16:18])[0]
-            rssi = data[18] if data[18] < 128 else data[18] - 256
-            order = struct.unpack('<H', data[19:21])[0]
+            (_, _, data_length, unix_time, device_id, sensor_id,
+             rssi, order) = _UPLINK_HDR.unpack_from(data)
             
             analysis.update({
                 "data_length": data_length,
@@ -56,7 +98,7 @@ def analyze_packet_structure(data: bytes) -> dict:
                 "order": order,
                 "sensor_data_start": 21,
                 "sensor_data_length": len(data) - 21,
-                "sensor_data": data[21:].hex(' ').upper()
+                "sensor_data": data[21:]
             })
             
             # Determine if this is illuminance sensor
@@ -66,24 +108,17 @@ def analyze_packet_structure(data: bytes) -> dict:
                 analysis["explanation"] = "通常のセンサーデータ（照度値）"
                 
                 # Parse illuminance data (simple structure)
-                sensor_data = data[21:]
-                if len(sensor_data) >= 12:
+                if len(data) - 21 >= 12:
                     # Last 4 bytes are illuminance value
-                    lux_bytes = sensor_data[-4:]
-                    lux_value = struct.unpack('<f', lux_bytes)[0]
+                    lux_value = _F32.unpack_from(data, len(data) - 4)[0]
                     analysis["illuminance_value"] = f"{lux_value:.2f} lux"
             
         elif packet_type == 0x01:  # Downlink response
-            analysis["type_name"] = "DOWNLINK_RESPONSE"
             analysis["structure"] = "ルーター仕様書 5-1-2"
             
             # Parse downlink response structure (fixed 20 bytes)
-            unix_time = struct.unpack('<L', data[2:6])[0]
-            device_id = struct.unpack('<Q', data[6:14])[0]
-            sensor_id = struct.unpack('<H', data[14:16])[0]
-            order = struct.unpack('<H', data[16:18])[0]
-            cmd = data[18]
-            result = data[19]
+            (_, _, unix_time, device_id, sensor_id, order,
+             cmd, result) = _DOWNLINK_RESP.unpack_from(data)
             
             analysis.update({
                 "unix_time": unix_time,
@@ -98,33 +133,34 @@ def analyze_packet_structure(data: bytes) -> dict:
             })
             
         elif packet_type == 0x02:  # JIG INFO response
-            analysis["type_name"] = "JIG_INFO_RESPONSE"
             analysis["structure"] = "ルーター仕様書 5-1-3"
             analysis["explanation"] = "JIG INFOコマンドの応答"
             
         else:
-            analysis["type_name"] = f"UNKNOWN(0x{packet_type:02X})"
             analysis["explanation"] = "未知のパケットタイプ"
             
         return analysis
         
     except Exception as e:
-        return {"error": f"Analysis error: {e}", "raw": data.hex(' ').upper()}
+        return {"error": f"Analysis error: {e}", "raw": data}
+
+def _hex(value: bytes) -> str:
+    """Format packet bytes for the JSON export"""
+    return value.hex(' ').upper()
+
+def dump_json(obj) -> str:
+    """Serialize to indented JSON (non-ASCII kept as-is), using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_hex, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=_hex)
+
+def get_packet_type_name(packet_type: int) -> str:
+    """Get packet type name"""
+    return _PACKET_TYPE_NAMES.get(packet_type, f"UNKNOWN(0x{packet_type:02X})")
 
 def get_result_description(result: int) -> str:
     """Get result code description"""
-    descriptions = {
-        0x00: "Success",
-        0x01: "Invalid Sensor ID", 
-        0x02: "Unsupported CMD",
-        0x03: "Parameter out of range",
-        0x04: "Connection failed",
-        0x05: "Timeout",
-        0x07: "Device not found",
-        0x08: "Router busy",
-        0x09: "Module busy"
-    }
-    return descriptions.get(result, f"Unknown(0x{result:02X})")
+    return _RESULT_DESC.get(result, f"Unknown(0x{result:02X})")
 
 def check_parameter_data_possibility(data: bytes) -> dict:
     """Check if uplink data could be parameter information"""
@@ -135,71 +171,92 @@ def check_parameter_data_possibility(data: bytes) -> dict:
     if packet_type != 0x00:
         return {"possible": False, "reason": "Not uplink notification"}
         
-    sensor_id = struct.unpack('<H', data[16:18])[0]
+    sensor_id = _U16.unpack_from(data, 16)[0]
     if sensor_id != 0x0121:
         return {"possible": False, "reason": "Not illuminance sensor"}
         
-    sensor_data = data[21:]
+    sensor_data_length = len(data) - 21
     
     # Check if this could be parameter data according to spec 5-2
     # Minimum size for parameter data: 2+2+2+3+1+1+1+2+4+1+1+4+4 = 28 bytes
-    if len(sensor_data) < 28:
+    if sensor_data_length < 28:
         return {
             "possible": False, 
-            "reason": f"Too short for parameter data (got {len(sensor_data)}, need ≥28)",
-            "actual_size": len(sensor_data),
+            "reason": f"Too short for parameter data (got {sensor_data_length}, need ≥28)",
+            "actual_size": sensor_data_length,
             "required_min_size": 28
         }
     
-    # Check if first 2 bytes are 0x0000 (SensorID for end device)
-    if len(sensor_data) >= 2:
-        first_sensor_id = struct.unpack('<H', sensor_data[0:2])[0]
-        if first_sensor_id != 0x0000:
-            return {
-                "possible": False,
-                "reason": f"First SensorID should be 0x0000, got 0x{first_sensor_id:04X}",
-                "first_bytes": sensor_data[0:2].hex(' ').upper()
-            }
+    # SensorID must be 0x0000 (the end device itself) and Sequence No 0xFFFF
+    first_sensor_id, sequence_no = _PARAM_MARKERS.unpack_from(data, 21)
+    if first_sensor_id == 0x0000 and sequence_no == 0xFFFF:
+        return {"possible": True, "reason": "Matches parameter data structure"}
     
-    # Check if sequence number is 0xFFFF
-    if len(sensor_data) >= 4:
-        sequence_no = struct.unpack('<H', sensor_data[2:4])[0]
-        if sequence_no != 0xFFFF:
-            return {
-                "possible": False,
-                "reason": f"Sequence No should be 0xFFFF, got 0x{sequence_no:04X}",
-                "sequence_bytes": sensor_data[2:4].hex(' ').upper()
-            }
+    if first_sensor_id != 0x0000:
+        return {
+            "possible": False,
+            "reason": f"First SensorID should be 0x0000, got 0x{first_sensor_id:04X}",
+            "first_bytes": data[21:23].hex(' ').upper()
+        }
     
-    return {"possible": True, "reason": "Matches parameter data structure"}
+    return {
+        "possible": False,
+        "reason": f"Sequence No should be 0xFFFF, got 0x{sequence_no:04X}",
+        "sequence_bytes": data[23:25].hex(' ').upper()
+    }
+
+def write_lines(lines: list):
+    """Write a block of output lines with a single stdout write"""
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def on_data_received(data: bytes):
     """Callback for received data"""
-    global uplink_notifications, downlink_responses, other_packets
+    global uplink_count, downlink_count, other_count
     
-    analysis = analyze_packet_structure(data)
     packet_type = data[1] if len(data) > 1 else 0xFF
+    sensor_id = _U16.unpack_from(data, 16)[0] if len(data) >= 18 else 0
+    
+    # Other packets are only counted unless VERBOSE is set
+    if VERBOSE or packet_type == 0x01 or (packet_type == 0x00 and sensor_id == 0x0121):
+        analysis = analyze_packet_structure(data)
+        type_name = analysis.get('type_name', 'Unknown')
+    else:
+        analysis = None
+        type_name = get_packet_type_name(packet_type) if len(data) >= 21 else 'Unknown'
     
-    print(f"\n📦 Received packet: Type 0x{packet_type:02X}")
-    print(f"   Length: {len(data)} bytes")
-    print(f"   Type: {analysis.get('type_name', 'Unknown')}")
+    lines = [
+        "",
+        f"📦 Received packet: Type 0x{packet_type:02X}",
+        f"   Length: {len(data)} bytes",
+        f"   Type: {type_name}"
+    ]
     
     if packet_type == 0x00:  # Uplink
-        uplink_notifications.append(analysis)
-        sensor_id = struct.unpack('<H', data[16:18])[0] if len(data) >= 18 else 0
+        if analysis is not None:
+            uplink_notifications.append(analysis)
+        uplink_count += 1
         if sensor_id == 0x0121:
-            print(f"   💡 Illuminance sensor data")
+            # Selected by the integer sensor ID here, so the summary
+            # doesn't have to filter on formatted strings
+            if len(data) >= 21 and len(illuminance_uplinks) < ILLUMINANCE_DETAIL_COUNT:
+                illuminance_uplinks.append(analysis)
+            lines.append("   💡 Illuminance sensor data")
             # Check if this could be parameter data
             param_check = check_parameter_data_possibility(data)
-            print(f"   📊 Parameter data possibility: {param_check}")
+            lines.append(f"   📊 Parameter data possibility: {param_check}")
             
     elif packet_type == 0x01:  # Downlink response
         downlink_responses.append(analysis)
-        print(f"   ✅ Downlink response")
+        downlink_count += 1
+        lines.append("   ✅ Downlink response")
         
     else:
-        other_packets.append(analysis)
-        print(f"   ❓ Other packet type")
+        if analysis is not None:
+            other_packets.append(analysis)
+        other_count += 1
+        lines.append("   ❓ Other packet type")
+    
+    write_lines(lines)
 
 def main():
     """Main verification function"""
@@ -216,17 +273,14 @@ def main():
             time.sleep(70)
             
             print(f'\n📊 検証結果サマリー:')
-            print(f'   アップリンク通知: {len(uplink_notifications)}個')
-            print(f'   ダウンリンクレスポンス: {len(downlink_responses)}個')
-            print(f'   その他パケット: {len(other_packets)}個')
+            print(f'   アップリンク通知: {uplink_count}個')
+            print(f'   ダウンリンクレスポンス: {downlink_count}個')
+            print(f'   その他パケット: {other_count}個')
             
             # Show detailed analysis for illuminance packets
-            illuminance_uplinks = [p for p in uplink_notifications 
-                                 if p.get('sensor_id') == '0x0121']
-            
             if illuminance_uplinks:
                 print(f'\n💡 照度センサーアップリンク詳細:')
-                for i, packet in enumerate(illuminance_uplinks[:3]):  # Show first 3
+                for i, packet in enumerate(illuminance_uplinks):
                     print(f'\n   パケット{i+1}:')
                     print(f'     Type: {packet.get("type_name")}')
                     print(f'     データ長: {packet.get("sensor_data_length")} bytes')
@@ -242,20 +296,23 @@ def main():
                     print(f'     Result: {packet.get("result_desc")}')
                     print(f'     Command: {packet.get("cmd")}')
             
-            # Export detailed analysis
+            # Export detailed analysis (receive times are formatted only here)
+            for packet in (*uplink_notifications, *downlink_responses, *other_packets):
+                if 'timestamp' in packet:
+                    packet['timestamp'] = datetime.fromtimestamp(packet['timestamp']).isoformat()
             all_analysis = {
                 'summary': {
-                    'uplink_count': len(uplink_notifications),
-                    'downlink_count': len(downlink_responses),
-                    'other_count': len(other_packets)
+                    'uplink_count': uplink_count,
+                    'downlink_count': downlink_count,
+                    'other_count': other_count
                 },
-                'uplink_notifications': uplink_notifications,
-                'downlink_responses': downlink_responses,
-                'other_packets': other_packets
+                'uplink_notifications': list(uplink_notifications),
+                'downlink_responses': list(downlink_responses),
+                'other_packets': list(other_packets)
             }
             
             print(f'\n💾 完全な解析結果をJSONで出力:')
-            json_output = json.dumps(all_analysis, ensure_ascii=False, indent=2)
+            json_output = dump_json(all_analysis)
             print('=' * 60)
             print(json_output[:1000] + '...' if len(json_output) > 1000 else json_output)
             
@@ -5,29 +5,79 @@ BraveJIG Protocol Analysis Test
 Advanced test to analyze BraveJIG protocol packets and demonstrate protocol parsing.
 """
 
-import time
 import signal
 import struct
 import sys
+import threading
+from collections import Counter, deque
 from datetime import datetime
+from functools import lru_cache
 from async_serial_monitor import AsyncSerialMonitor
 
-# Global flag for graceful shutdown
-test_running = True
-received_packets = []
+_HDR = struct.Struct('<BBHLQHbH')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<L')
+_F32 = struct.Struct('<f')
+_F32X2 = struct.Struct('<ff')
+_F32X3 = struct.Struct('<fff')
+
+_PACKET_TYPES = {
+    0x00: "UPLINK_NOTIFICATION",
+    0x01: "DOWNLINK_RESPONSE/JIG_INFO_REQUEST",
+    0x02: "JIG_INFO_RESPONSE",
+    0xFF: "ERROR_NOTIFICATION"
+}
+
+_SENSOR_NAMES = {
+    0x0121: "Illuminance",
+    0x0122: "Accelerometer",
+    0x0123: "Temperature/Humidity",
+    0x0124: "Barometric Pressure",
+    0x0125: "Distance/Ranging",
+    0x0126: "Dry Contact Input",
+    0x0127: "Wet Contact Input",
+    0x0128: "2ch Contact Output"
+}
+
+@lru_cache(maxsize=1024)
+def _format_time(unix_time: int) -> str:
+    """Format a UnixTime as HH:MM:SS, cached since packets arrive in bursts"""
+    return datetime.fromtimestamp(unix_time).strftime('%H:%M:%S')
+
+def _iter_samples(sample: struct.Struct, data: bytes):
+    """Iterate over the whole samples in data, ignoring a trailing partial one"""
+    return sample.iter_unpack(data[:len(data) - len(data) % sample.size])
+
+# Number of recent analyses kept; the analyzer counts every packet
+MAX_STORED_PACKETS = 64
+
+received_packets = deque(maxlen=MAX_STORED_PACKETS)
+
+# Ends the monitoring period early on Ctrl+C
+stop_requested = threading.Event()
 
 def signal_handler(signum, frame):
     """Handle Ctrl+C gracefully"""
-    global test_running
     print("\n🛑 Stopping protocol analysis...")
-    test_running = False
+    stop_requested.set()
 
 class BraveJIGProtocolAnalyzer:
     """Analyze BraveJIG protocol packets"""
     
     def __init__(self):
         self.packet_count = 0
-        self.sensor_types = {}
+        # Packets per sensor ID, and each sensor's (name, device ID) from
+        # its first packet; get_summary combines them
+        self._sensor_counts = Counter()
+        self._sensor_info = {}
+        # Measurement parsers keyed by sensor ID
+        self._parsers = {
+            0x0121: self._parse_illuminance,
+            0x0122: self._parse_accelerometer,
+            0x0123: self._parse_temp_humidity,
+            0x0124: self._parse_pressure,
+            0x0125: self._parse_distance
+        }
     
     def analyze_packet(self, data: bytes) -> dict:
         """Analyze received BraveJIG packet"""
@@ -38,17 +88,12 @@ class BraveJIGProtocolAnalyzer:
         
         try:
             # Parse router header (20 bytes)
-            protocol_version = data[0]
-            packet_type = data[1]
-            data_length = struct.unpack('<H', data[2:4])[0]
-            unix_time = struct.unpack('<L', data[4:8])[0]
-            device_id = struct.unpack('<Q', data[8:16])[0]
-            sensor_id = struct.unpack('<H', data[16:18])[0]
-            rssi = data[18] if data[18] < 128 else data[18] - 256  # Convert to signed
-            order = struct.unpack('<H', data[19:21])[0]
+            (protocol_version, packet_type, data_length, unix_time,
+             device_id, sensor_id, rssi, order) = _HDR.unpack_from(data)
             
-            # Parse sensor data (starting at index 21)
-            sensor_data = data[21:]
+            # Parse sensor data (starting at index 21) through a view, so
+            # the measurement parsers below slice it without copying
+            sensor_data = memoryview(data)[21:]
             
             result = {
                 "packet_number": self.packet_count,
@@ -57,7 +102,7 @@ class BraveJIGProtocolAnalyzer:
                 "type_name": self._get_type_name(packet_type),
                 "data_length": data_length,
                 "unix_time": unix_time,
-                "timestamp": datetime.fromtimestamp(unix_time).strftime('%H:%M:%S'),
+                "timestamp": _format_time(unix_time),
                 "device_id": f"0x{device_id:016X}",
                 "sensor_id": f"0x{sensor_id:04X}",
                 "sensor_name": self._get_sensor_name(sensor_id),
@@ -68,13 +113,9 @@ class BraveJIGProtocolAnalyzer:
             }
             
             # Track sensor types
-            if sensor_id not in self.sensor_types:
-                self.sensor_types[sensor_id] = {
-                    "name": self._get_sensor_name(sensor_id),
-                    "count": 0,
-                    "device_id": device_id
-                }
-            self.sensor_types[sensor_id]["count"] += 1
+            self._sensor_counts[sensor_id] += 1
+            if sensor_id not in self._sensor_info:
+                self._sensor_info[sensor_id] = (self._get_sensor_name(sensor_id), device_id)
             
             # Parse sensor-specific data if it's an uplink notification
             if packet_type == 0x00 and len(sensor_data) >= 4:
@@ -92,27 +133,11 @@ class BraveJIGProtocolAnalyzer:
     
     def _get_type_name(self, packet_type: int) -> str:
         """Get packet type name"""
-        types = {
-            0x00: "UPLINK_NOTIFICATION",
-            0x01: "DOWNLINK_RESPONSE/JIG_INFO_REQUEST",
-            0x02: "JIG_INFO_RESPONSE",
-            0xFF: "ERROR_NOTIFICATION"
-        }
-        return types.get(packet_type, f"UNKNOWN(0x{packet_type:02X})")
+        return _PACKET_TYPES.get(packet_type, f"UNKNOWN(0x{packet_type:02X})")
     
     def _get_sensor_name(self, sensor_id: int) -> str:
         """Get sensor name from sensor ID"""
-        sensors = {
-            0x0121: "Illuminance",
-            0x0122: "Accelerometer",
-            0x0123: "Temperature/Humidity", 
-            0x0124: "Barometric Pressure",
-            0x0125: "Distance/Ranging",
-            0x0126: "Dry Contact Input",
-            0x0127: "Wet Contact Input",
-            0x0128: "2ch Contact Output"
-        }
-        return sensors.get(sensor_id, f"Unknown(0x{sensor_id:04X})")
+        return _SENSOR_NAMES.get(sensor_id, f"Unknown(0x{sensor_id:04X})")
     
     def _parse_sensor_data(self, sensor_id: int, data: bytes) -> dict:
         """Parse sensor-specific data"""
@@ -121,8 +146,8 @@ class BraveJIGProtocolAnalyzer:
                 return {"sensor_parse": "Insufficient data"}
             
             # Common header: SensorID(2) + SequenceNo(2) 
-            sensor_id_confirm = struct.unpack('<H', data[0:2])[0]
-            sequence_no = struct.unpack('<H', data[2:4])[0]
+            sensor_id_confirm = _U16.unpack_from(data, 0)[0]
+            sequence_no = _U16.unpack_from(data, 2)[0]
             
             result = {
                 "sensor_id_confirm": f"0x{sensor_id_confirm:04X}",
@@ -138,24 +163,17 @@ class BraveJIGProtocolAnalyzer:
                 })
             
             if len(data) >= 10:
-                sensor_time = struct.unpack('<L', data[6:10])[0]
-                result["sensor_time"] = datetime.fromtimestamp(sensor_time).strftime('%H:%M:%S')
+                sensor_time = _U32.unpack_from(data, 6)[0]
+                result["sensor_time"] = _format_time(sensor_time)
             
             if len(data) >= 12:
-                sample_num = struct.unpack('<H', data[10:12])[0]
+                sample_num = _U16.unpack_from(data, 10)[0]
                 result["sample_count"] = sample_num
                 
                 # Parse measurement data based on sensor type
-                if sensor_id == 0x0121:  # Illuminance
-                    result.update(self._parse_illuminance(data[12:]))
-                elif sensor_id == 0x0122:  # Accelerometer
-                    result.update(self._parse_accelerometer(data[12:]))
-                elif sensor_id == 0x0123:  # Temperature/Humidity
-                    result.update(self._parse_temp_humidity(data[12:]))
-                elif sensor_id == 0x0124:  # Pressure
-                    result.update(self._parse_pressure(data[12:]))
-                elif sensor_id == 0x0125:  # Distance
-                    result.update(self._parse_distance(data[12:]))
+                parser = self._parsers.get(sensor_id)
+                if parser:
+                    result.update(parser(data[12:]))
             
             return result
             
@@ -164,90 +182,57 @@ class BraveJIGProtocolAnalyzer:
     
     def _parse_temp_humidity(self, data: bytes) -> dict:
         """Parse temperature/humidity data"""
-        result = {"measurements": []}
-        try:
-            for i in range(0, len(data), 8):  # 8 bytes per measurement
-                if i + 8 <= len(data):
-                    temp = struct.unpack('<f', data[i:i+4])[0]
-                    humidity = struct.unpack('<f', data[i+4:i+8])[0]
-                    result["measurements"].append({
-                        "temperature": f"{temp:.2f}°C",
-                        "humidity": f"{humidity:.1f}%"
-                    })
-        except:
-            pass
-        return result
+        return {"measurements": [
+            {"temperature": f"{temp:.2f}°C", "humidity": f"{humidity:.1f}%"}
+            for temp, humidity in _iter_samples(_F32X2, data)
+        ]}
     
     def _parse_accelerometer(self, data: bytes) -> dict:
         """Parse accelerometer data"""
-        result = {"measurements": []}
-        try:
-            for i in range(0, len(data), 12):  # 12 bytes per measurement
-                if i + 12 <= len(data):
-                    x = struct.unpack('<f', data[i:i+4])[0]
-                    y = struct.unpack('<f', data[i+4:i+8])[0]
-                    z = struct.unpack('<f', data[i+8:i+12])[0]
-                    result["measurements"].append({
-                        "x_axis": f"{x:.2f}mG",
-                        "y_axis": f"{y:.2f}mG", 
-                        "z_axis": f"{z:.2f}mG"
-                    })
-        except:
-            pass
-        return result
+        return {"measurements": [
+            {"x_axis": f"{x:.2f}mG", "y_axis": f"{y:.2f}mG", "z_axis": f"{z:.2f}mG"}
+            for x, y, z in _iter_samples(_F32X3, data)
+        ]}
     
     def _parse_pressure(self, data: bytes) -> dict:
         """Parse pressure data"""
-        result = {"measurements": []}
-        try:
-            for i in range(0, len(data), 4):  # 4 bytes per measurement
-                if i + 4 <= len(data):
-                    pressure = struct.unpack('<f', data[i:i+4])[0]
-                    result["measurements"].append({
-                        "pressure": f"{pressure:.2f}hPa"
-                    })
-        except:
-            pass
-        return result
+        return {"measurements": [
+            {"pressure": f"{pressure:.2f}hPa"}
+            for pressure, in _iter_samples(_F32, data)
+        ]}
     
     def _parse_distance(self, data: bytes) -> dict:
         """Parse distance data"""
-        result = {"measurements": []}
-        try:
-            for i in range(0, len(data), 4):  # 4 bytes per measurement
-                if i + 4 <= len(data):
-                    distance = struct.unpack('<f', data[i:i+4])[0]
-                    result["measurements"].append({
-                        "distance": f"{distance:.2f}mm"
-                    })
-        except:
-            pass
-        return result
+        return {"measurements": [
+            {"distance": f"{distance:.2f}mm"}
+            for distance, in _iter_samples(_F32, data)
+        ]}
     
     def _parse_illuminance(self, data: bytes) -> dict:
         """Parse illuminance data"""
-        result = {"measurements": []}
-        try:
-            for i in range(0, len(data), 4):  # 4 bytes per measurement
-                if i + 4 <= len(data):
-                    illuminance = struct.unpack('<f', data[i:i+4])[0]
-                    result["measurements"].append({
-                        "illuminance": f"{illuminance:.2f}lux"
-                    })
-        except:
-            pass
-        return result
+        return {"measurements": [
+            {"illuminance": f"{illuminance:.2f}lux"}
+            for illuminance, in _iter_samples(_F32, data)
+        ]}
     
     def get_summary(self) -> dict:
         """Get analysis summary"""
+        counts = self._sensor_counts
         return {
             "total_packets": self.packet_count,
-            "sensor_types": self.sensor_types
+            "sensor_types": {
+                sensor_id: {"name": name, "count": counts[sensor_id], "device_id": device_id}
+                for sensor_id, (name, device_id) in self._sensor_info.items()
+            }
         }
 
 # Global analyzer instance
 analyzer = BraveJIGProtocolAnalyzer()
 
+def write_lines(lines: list):
+    """Write a block of output lines with a single stdout write"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
 def on_data_received(data: bytes):
     """Callback for received data with protocol analysis"""
     global received_packets
@@ -255,20 +240,25 @@ def on_data_received(data: bytes):
     analysis = analyzer.analyze_packet(data)
     received_packets.append(analysis)
     
-    print(f"\n📦 Packet #{analysis.get('packet_number', '?')}")
-    print(f"   Type: {analysis.get('type_name', 'Unknown')}")
-    print(f"   Sensor: {analysis.get('sensor_name', 'Unknown')}")
-    print(f"   Time: {analysis.get('timestamp', 'Unknown')}")
-    print(f"   RSSI: {analysis.get('rssi', 'Unknown')}")
-    print(f"   Battery: {analysis.get('battery_level', 'Unknown')}")
+    lines = [
+        "",
+        f"📦 Packet #{analysis.get('packet_number', '?')}",
+        f"   Type: {analysis.get('type_name', 'Unknown')}",
+        f"   Sensor: {analysis.get('sensor_name', 'Unknown')}",
+        f"   Time: {analysis.get('timestamp', 'Unknown')}",
+        f"   RSSI: {analysis.get('rssi', 'Unknown')}",
+        f"   Battery: {analysis.get('battery_level', 'Unknown')}"
+    ]
     
     # Show measurements if available
     if 'measurements' in analysis and analysis['measurements']:
-        print(f"   Measurements:")
+        lines.append("   Measurements:")
         for i, measurement in enumerate(analysis['measurements'][:2]):  # Show first 2
-            print(f"     [{i+1}] {measurement}")
+            lines.append(f"     [{i+1}] {measurement}")
         if len(analysis['measurements']) > 2:
-            print(f"     ... and {len(analysis['measurements']) - 2} more")
+            lines.append(f"     ... and {len(analysis['measurements']) - 2} more")
+    
+    write_lines(lines)
 
 def on_error(error: Exception):
     """Callback for errors"""
@@ -281,8 +271,6 @@ def on_connection_changed(connected: bool):
 
 def main():
     """Main protocol analysis function"""
-    global test_running
-    
     # Setup signal handler
     signal.signal(signal.SIGINT, signal_handler)
     
@@ -311,10 +299,7 @@ def main():
             print("   Press Ctrl+C to stop early")
             
             # Monitor for 120 seconds (2 uplink cycles)
-            start_time = time.time()
-            
-            while test_running and monitor.is_monitoring and (time.time() - start_time) < 120:
-                time.sleep(0.1)
+            stop_requested.wait(timeout=120)
             
             # Print summary
             summary = analyzer.get_summary()
@@ -8,16 +8,16 @@ Short connection test to verify basic functionality without long waits.
 import time
 import signal
 import sys
+import threading
 from async_serial_monitor import AsyncSerialMonitor
 
-# Global flag for graceful shutdown
-test_running = True
+# Ends the monitoring period early on Ctrl+C
+stop_requested = threading.Event()
 
 def signal_handler(signum, frame):
     """Handle Ctrl+C gracefully"""
-    global test_running
     print("\n🛑 Stopping connection test...")
-    test_running = False
+    stop_requested.set()
 
 def on_data_received(data: bytes):
     """Callback for received data"""
@@ -34,8 +34,6 @@ def on_connection_changed(connected: bool):
 
 def main():
     """Main connection test function"""
-    global test_running
-    
     # Setup signal handler
     signal.signal(signal.SIGINT, signal_handler)
     
@@ -68,10 +66,7 @@ def main():
             print("   Press Ctrl+C to stop early")
             
             # Monitor for 10 seconds
-            start_time = time.time()
-            
-            while test_running and monitor.is_monitoring and (time.time() - start_time) < 10:
-                time.sleep(0.1)
+            stop_requested.wait(timeout=10)
             
             # Test sending data (JIG Info command)
             print("📤 Testing data transmission...")
@@ -11,6 +11,9 @@ import struct
 import sys
 from async_serial_monitor import AsyncSerialMonitor
 
+# JIG INFO request: Ver, Type, CMD, LocalTime, UnixTime
+_JIG_REQ = struct.Struct('<BBBLL')
+
 # Global flag for graceful shutdown
 test_running = True
 
@@ -54,9 +57,10 @@ def main():
             print(f"✅ Monitoring: Started")
             
             # Send one JIG INFO command
-            jig_packet = struct.pack('<BBB', 0x01, 0x01, 0x02)  # FW version request
-            jig_packet += struct.pack('<L', int(time.time()) + 9*3600)  # Local time
-            jig_packet += struct.pack('<L', int(time.time()))  # Unix time
+            unix_time = int(time.time())
+            jig_packet = _JIG_REQ.pack(0x01, 0x01, 0x02,  # FW version request
+                                       unix_time + 9*3600,  # Local time
+                                       unix_time)
             
             print(f"📤 Sending JIG INFO command...")
             monitor.send(jig_packet)
@@ -10,8 +10,32 @@ import signal
 import struct
 import sys
 from datetime import datetime
+from typing import NamedTuple, Union
 from async_serial_monitor import AsyncSerialMonitor
 
+# JIG INFO request: Ver, Type, CMD, LocalTime, UnixTime
+_JIG_REQ = struct.Struct('<BBBLL')
+# JIG INFO response header: Ver, Type, UnixTime, CMD, RouterDeviceID
+_JIG_RESP_HDR = struct.Struct('<BBLBQ')
+
+_CMD_NAMES = {
+    0x00: "STOP",
+    0x01: "START",
+    0x02: "FW_VERSION_GET",
+    0x67: "SCAN_MODE_GET",
+    0x69: "SCAN_MODE_SET_LONG_RANGE",
+    0x6A: "SCAN_MODE_SET_LEGACY"
+}
+
+class JigInfoResponse(NamedTuple):
+    """JIG INFO response (Type: 0x02) fields as received"""
+    protocol_version: int
+    packet_type: int
+    unix_time: int
+    cmd: int
+    router_device_id: int
+    response_data: bytes
+
 # Global flag for graceful shutdown
 test_running = True
 responses_received = []
@@ -26,71 +50,60 @@ def create_jig_info_request(cmd: int) -> bytes:
     """Create JIG INFO request packet"""
     protocol_version = 0x01
     packet_type = 0x01
-    local_time = int(time.time()) + 9*3600  # JST (UTC+9)
     unix_time = int(time.time())
+    local_time = unix_time + 9*3600  # JST (UTC+9)
     
-    packet = struct.pack('<BBB', protocol_version, packet_type, cmd)
-    packet += struct.pack('<L', local_time)
-    packet += struct.pack('<L', unix_time)
-    
-    return packet
+    return _JIG_REQ.pack(protocol_version, packet_type, cmd, local_time, unix_time)
 
-def parse_jig_info_response(data: bytes) -> dict:
-    """Parse JIG INFO response"""
+def parse_jig_info_response(data: bytes) -> Union[JigInfoResponse, dict]:
+    """Parse JIG INFO response
+    
+    Returns the raw fields; format_response() builds the display values when
+    they are printed. Error dicts keep the packet bytes unformatted under "raw".
+    """
     try:
-        if len(data) < 15:
-            return {"error": "Response too short", "raw": data.hex(' ').upper()}
-        
-        protocol_version = data[0]
-        packet_type = data[1]
-        unix_time = struct.unpack('<L', data[2:6])[0]
-        cmd = data[6]
-        router_device_id = struct.unpack('<Q', data[7:15])[0]
-        response_data = data[15:] if len(data) > 15 else b''
+        if len(data) < _JIG_RESP_HDR.size:
+            return {"error": "Response too short", "raw": bytes(data)}
         
-        result = {
-            "protocol_version": f"0x{protocol_version:02X}",
-            "type": f"0x{packet_type:02X}",
-            "type_name": "JIG_INFO_RESPONSE" if packet_type == 0x02 else "UNKNOWN",
-            "unix_time": unix_time,
-            "timestamp": datetime.fromtimestamp(unix_time).strftime('%H:%M:%S'),
-            "cmd": f"0x{cmd:02X}",
-            "cmd_name": get_cmd_name(cmd),
-            "router_device_id": f"0x{router_device_id:016X}",
-            "response_data": response_data.hex(' ').upper() if response_data else "None",
-            "raw": data.hex(' ').upper()
-        }
-        
-        # Parse specific responses
-        if cmd == 0x02 and len(response_data) >= 3:  # FW Version
-            major = response_data[0]
-            minor = response_data[1]
-            build = response_data[2]
-            result["firmware_version"] = f"{major}.{minor}.{build}"
-        elif cmd == 0x67 and len(response_data) >= 1:  # Scan Mode
-            mode = response_data[0]
-            mode_name = "Long Range" if mode == 0x00 else "Legacy" if mode == 0x01 else "Unknown"
-            result["scan_mode"] = f"0x{mode:02X} ({mode_name})"
-        elif cmd in [0x00, 0x01] and len(response_data) >= 1:  # Start/Stop
-            success = response_data[0]
-            result["result"] = "Success" if success == 0x01 else "Failed"
-        
-        return result
+        return JigInfoResponse(*_JIG_RESP_HDR.unpack_from(data), bytes(data[_JIG_RESP_HDR.size:]))
         
     except Exception as e:
-        return {"error": f"Parse error: {e}", "raw": data.hex(' ').upper()}
+        return {"error": f"Parse error: {e}", "raw": bytes(data)}
 
-def get_cmd_name(cmd: int) -> str:
-    """Get command name"""
-    commands = {
-        0x00: "STOP",
-        0x01: "START", 
-        0x02: "FW_VERSION_GET",
-        0x67: "SCAN_MODE_GET",
-        0x69: "SCAN_MODE_SET_LONG_RANGE",
-        0x6A: "SCAN_MODE_SET_LEGACY"
+def format_response(response: Union[JigInfoResponse, dict]) -> dict:
+    """Build display values for a parsed JIG INFO response (error dicts pass through)"""
+    if not isinstance(response, JigInfoResponse):
+        return response
+    
+    cmd = response.cmd
+    response_data = response.response_data
+    result = {
+        "protocol_version": f"0x{response.protocol_version:02X}",
+        "type": f"0x{response.packet_type:02X}",
+        "type_name": "JIG_INFO_RESPONSE" if response.packet_type == 0x02 else "UNKNOWN",
+        "unix_time": response.unix_time,
+        "timestamp": datetime.fromtimestamp(response.unix_time).strftime('%H:%M:%S'),
+        "cmd": f"0x{cmd:02X}",
+        "cmd_name": _CMD_NAMES.get(cmd) or f"UNKNOWN(0x{cmd:02X})",
+        "router_device_id": f"0x{response.router_device_id:016X}",
+        "response_data": response_data.hex(' ').upper() if response_data else "None"
     }
-    return commands.get(cmd, f"UNKNOWN(0x{cmd:02X})")
+    
+    # Parse specific responses
+    if cmd == 0x02 and len(response_data) >= 3:  # FW Version
+        major = response_data[0]
+        minor = response_data[1]
+        build = response_data[2]
+        result["firmware_version"] = f"{major}.{minor}.{build}"
+    elif cmd == 0x67 and len(response_data) >= 1:  # Scan Mode
+        mode = response_data[0]
+        mode_name = "Long Range" if mode == 0x00 else "Legacy" if mode == 0x01 else "Unknown"
+        result["scan_mode"] = f"0x{mode:02X} ({mode_name})"
+    elif cmd in [0x00, 0x01] and len(response_data) >= 1:  # Start/Stop
+        success = response_data[0]
+        result["result"] = "Success" if success == 0x01 else "Failed"
+    
+    return result
 
 def on_data_received(data: bytes):
     """Callback for received data"""
@@ -100,8 +113,9 @@ def on_data_received(data: bytes):
     
     # Check if this looks like a JIG INFO response
     if len(data) >= 2 and data[1] == 0x02:  # JIG INFO response type
-        response = parse_jig_info_response(data)
-        responses_received.append(response)
+        parsed = parse_jig_info_response(data)
+        responses_received.append(parsed)
+        response = format_response(parsed)
         
         print(f"✅ JIG INFO Response:")
         print(f"   Command: {response.get('cmd_name', 'Unknown')}")
@@ -203,7 +217,7 @@ def main():
             
             if responses_received:
                 print(f"\n📋 Received Responses:")
-                for i, response in enumerate(responses_received):
+                for i, response in enumerate(map(format_response, responses_received)):
                     print(f"   {i+1}. {response.get('cmd_name', 'Unknown')} at {response.get('timestamp', 'Unknown')}")
                     if 'firmware_version' in response:
                         print(f"      Firmware: {response['firmware_version']}")
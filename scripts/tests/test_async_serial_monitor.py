@@ -6,6 +6,8 @@ including mock serial communication for testing without actual hardware.
 """
 
 import unittest
+import os
+import struct
 import time
 import threading
 from unittest.mock import Mock, patch, MagicMock
@@ -265,6 +267,86 @@ class TestAsyncSerialMonitor(unittest.TestCase):
         monitor.stop_monitoring()
         monitor.disconnect()
     
+    @patch('serial.Serial')
+    def test_data_reception_wakes_on_readable_port(self, mock_serial_class):
+        """Test monitor loop waits on the port descriptor and wakes on data"""
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        self.addCleanup(os.close, write_fd)
+
+        # Setup mock backed by a real pollable descriptor
+        mock_serial = Mock()
+        mock_serial.is_open = True
+        mock_serial.in_waiting = 0
+        mock_serial.fileno.return_value = read_fd
+        mock_serial.read.side_effect = lambda size: os.read(read_fd, size)
+        mock_serial_class.return_value = mock_serial
+
+        monitor = AsyncSerialMonitor(logger=self.mock_logger)
+        received = threading.Event()
+        monitor.set_data_callback(lambda data: received.set())
+
+        monitor.connect()
+        monitor.start_monitoring()
+
+        # Make data available on the port
+        mock_serial.in_waiting = 4
+        os.write(write_fd, b'test')
+
+        self.assertTrue(received.wait(timeout=1.0))
+
+        # Clean up
+        monitor.stop_monitoring()
+        monitor.disconnect()
+
+    @unittest.skipIf(sys.platform == 'win32', "requires FIONREAD on a pipe")
+    @patch('serial.Serial')
+    def test_data_reception_frame_written_in_two_parts(self, mock_serial_class):
+        """Test a frame arriving in two writes reaches the callback whole"""
+        import fcntl
+        import termios
+
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        self.addCleanup(os.close, write_fd)
+
+        def bytes_waiting():
+            return struct.unpack('i', fcntl.ioctl(read_fd, termios.FIONREAD, b'\0\0\0\0'))[0]
+
+        # Setup mock whose in_waiting reports the bytes buffered in the pipe
+        mock_serial = Mock()
+        mock_serial.is_open = True
+        type(mock_serial).in_waiting = property(lambda self: bytes_waiting())
+        mock_serial.fileno.return_value = read_fd
+        mock_serial.read.side_effect = lambda size: os.read(read_fd, size)
+        mock_serial_class.return_value = mock_serial
+
+        monitor = AsyncSerialMonitor(logger=self.mock_logger)
+        chunks = []
+        received = threading.Event()
+
+        def on_data(data):
+            chunks.append(data)
+            received.set()
+
+        monitor.set_data_callback(on_data)
+        monitor.connect()
+        monitor.start_monitoring()
+
+        # Write one 21-byte frame split across two writes
+        frame = bytes(range(21))
+        os.write(write_fd, frame[:6])
+        time.sleep(0.0005)
+        os.write(write_fd, frame[6:])
+
+        self.assertTrue(received.wait(timeout=1.0))
+        time.sleep(0.05)
+        self.assertEqual(chunks, [frame])
+
+        # Clean up
+        monitor.stop_monitoring()
+        monitor.disconnect()
+
     @patch('serial.Serial')
     def test_context_manager(self, mock_serial_class):
         """Test context manager functionality"""
@@ -0,0 +1,40 @@
+"""
+Unit tests for bravejig_rx
+
+Checks packet classification for uplink notifications, downlink responses
+and short or unknown packets.
+"""
+
+import unittest
+import struct
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bravejig_rx import classify, PACKET_TYPE_UPLINK, PACKET_TYPE_DOWNLINK_RESPONSE
+
+
+class TestClassify(unittest.TestCase):
+    """Test cases for classify"""
+
+    def test_uplink(self):
+        """Test sensor ID is read from the uplink header"""
+        packet = struct.pack('<BBHLQH', 0x01, 0x00, 0, 1700000000, 0x2468800203400004, 0x0121) + b'\x00' * 5
+        self.assertEqual(classify(packet), (PACKET_TYPE_UPLINK, 0x0121))
+
+    def test_downlink_response(self):
+        """Test sensor ID is read from the downlink response header"""
+        packet = struct.pack('<BBLQHHBB', 0x01, 0x01, 1700000000, 0x2468800203400004, 0x0124, 0x0000, 0x06, 0x00)
+        self.assertEqual(classify(memoryview(packet)), (PACKET_TYPE_DOWNLINK_RESPONSE, 0x0124))
+
+    def test_short_and_unknown_packets(self):
+        """Test packets without a readable sensor ID"""
+        self.assertEqual(classify(b'\x01'), (None, None))
+        self.assertEqual(classify(b'\x01\x00\x00'), (PACKET_TYPE_UPLINK, None))
+        self.assertEqual(classify(b'\x01\x02' + b'\x00' * 20), (0x02, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
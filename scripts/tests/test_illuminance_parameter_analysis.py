@@ -0,0 +1,103 @@
+"""
+Unit tests for illuminance_parameter_analysis
+
+Checks the spec 5-2 parameter parser against hand-built uplink packets,
+including the per-field hex dumps produced in verbose mode.
+"""
+
+import unittest
+import struct
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from illuminance_parameter_analysis import parse_illuminance_parameter_detailed
+
+
+def build_parameter_uplink(extra: bytes = b'') -> bytes:
+    """Build an illuminance parameter uplink packet (header + 28-byte sensor data)"""
+    sensor_data = struct.pack(
+        '<HHH3sBBBHLBBff',
+        0x0000,             # End device SensorID
+        0xFFFF,             # Sequence No
+        0x0121,             # Connected Sensor ID
+        bytes([1, 2, 3]),   # FW Version
+        9,                  # TimeZone
+        1,                  # BLE Mode
+        4,                  # Tx Power
+        100,                # Advertise Interval
+        60,                 # Sensor Uplink Interval
+        0,                  # Sensor Read Mode
+        1,                  # Sampling
+        1000.0,             # HysteresisHigh
+        10.5                # HysteresisLow
+    ) + extra
+    header = struct.pack('<BBHLQH', 0x01, 0x00, len(sensor_data), 1700000000,
+                         0x2468800203400004, 0x0121)
+    return header + b'\x00\x00\x00' + sensor_data
+
+
+class TestParseIlluminanceParameterDetailed(unittest.TestCase):
+    """Test cases for parse_illuminance_parameter_detailed"""
+
+    def test_values(self):
+        """Test decoded parameter values"""
+        result = parse_illuminance_parameter_detailed(build_parameter_uplink())
+        sensor_data = result['parameter_info']['sensor_data']
+
+        self.assertEqual(result['packet_info']['device_id'], '0x2468800203400004')
+        self.assertEqual(result['parameter_info']['sequence_no']['value'], 0xFFFF)
+        self.assertEqual(sensor_data['fw_version']['value'], '1.2.3')
+        self.assertEqual(sensor_data['advertise_interval']['value'], 100)
+        self.assertEqual(sensor_data['sensor_uplink_interval']['value'], 60)
+        self.assertEqual(sensor_data['hysteresis_high']['value'], 1000.0)
+        self.assertEqual(sensor_data['hysteresis_low']['value'], 10.5)
+        self.assertNotIn('bytes', sensor_data['hysteresis_low'])
+
+    def test_verbose_bytes_match_field_slices(self):
+        """Test that verbose hex dumps equal the hex of each field's own bytes"""
+        packet = build_parameter_uplink(extra=b'\xAA\xBB')
+        raw = packet[21:]
+        result = parse_illuminance_parameter_detailed(packet, verbose=True)
+        info = result['parameter_info']
+        sensor_data = info['sensor_data']
+
+        expected = [
+            (info['end_device_sensor_id'], 0, 2),
+            (info['sequence_no'], 2, 2),
+            (sensor_data['connected_sensor_id'], 4, 2),
+            (sensor_data['fw_version'], 6, 3),
+            (sensor_data['advertise_interval'], 12, 2),
+            (sensor_data['sensor_uplink_interval'], 14, 4),
+            (sensor_data['hysteresis_high'], 20, 4),
+            (sensor_data['hysteresis_low'], 24, 4),
+            (info['remaining_data'], 28, 2),
+        ]
+        for field, offset, length in expected:
+            self.assertEqual(field['bytes'], raw[offset:offset+length].hex(' ').upper())
+
+    def test_key_order(self):
+        """Test that the JSON key order matches the exported layout"""
+        result = parse_illuminance_parameter_detailed(
+            build_parameter_uplink(extra=b'\xAA\xBB'), verbose=True,
+            received_at=datetime(2024, 1, 1, 12, 0, 0))
+
+        self.assertEqual(list(result['packet_info']),
+                         ['total_length', 'sensor_data_length', 'timestamp', 'sensor_id', 'device_id'])
+        self.assertEqual(result['packet_info']['timestamp'], '2024-01-01T12:00:00')
+        self.assertEqual(list(result['parameter_info']['remaining_data']),
+                         ['length', 'bytes', 'description'])
+
+    def test_not_illuminance(self):
+        """Test rejection of other sensor IDs"""
+        packet = bytearray(build_parameter_uplink())
+        packet[16:18] = b'\x22\x01'
+        result = parse_illuminance_parameter_detailed(bytes(packet))
+        self.assertEqual(result, {'error': 'Not illuminance sensor'})
+
+
+if __name__ == '__main__':
+    unittest.main()
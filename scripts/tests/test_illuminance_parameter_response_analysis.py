@@ -0,0 +1,88 @@
+"""
+Unit tests for illuminance_parameter_response_analysis
+
+Checks the downlink response analysis and the parameter acquisition request
+against hand-built packets.
+"""
+
+import unittest
+import struct
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from illuminance_parameter_response_analysis import (
+    analyze_downlink_response_complete,
+    create_illuminance_parameter_request
+)
+
+
+def build_response(result: int = 0x02, sensor_id: int = 0x0121, extra: bytes = b'') -> bytes:
+    """Build a 20-byte downlink response packet (plus optional trailing bytes)"""
+    return struct.pack('<BBLQHHBB', 0x01, 0x01, 1700000000, 0x2468800203400004,
+                       sensor_id, 0x0000, 0x06, result) + extra
+
+
+class TestAnalyzeDownlinkResponseComplete(unittest.TestCase):
+    """Test cases for analyze_downlink_response_complete"""
+
+    def test_fields(self):
+        """Test decoded header fields and their byte dumps"""
+        analysis = analyze_downlink_response_complete(build_response())
+
+        self.assertEqual(list(analysis), [
+            'response_metadata', 'protocol_version', 'packet_type', 'unix_time',
+            'device_id', 'sensor_id', 'order', 'cmd', 'result', 'validation',
+            'parameter_acquisition_analysis'
+        ])
+        self.assertEqual(analysis['device_id']['hex'], '0x2468800203400004')
+        self.assertEqual(analysis['device_id']['bytes'], '04 00 40 03 02 80 68 24')
+        self.assertEqual(analysis['unix_time']['value'], 1700000000)
+        self.assertEqual(analysis['cmd']['name'], 'GET_PARAMETER')
+        self.assertEqual(analysis['result']['hex'], '0x02')
+        self.assertEqual(analysis['result']['bytes'], '02')
+        self.assertEqual(analysis['result']['error_category'], 'REQUEST_ERROR')
+        self.assertTrue(analysis['validation']['overall_valid'])
+
+    def test_additional_data(self):
+        """Test trailing bytes are reported and fail validation"""
+        analysis = analyze_downlink_response_complete(build_response(extra=b'\xAA\xBB'))
+
+        self.assertEqual(analysis['additional_data']['length'], 2)
+        self.assertEqual(analysis['additional_data']['bytes'], 'AA BB')
+        self.assertFalse(analysis['validation']['overall_valid'])
+
+    def test_unknown_result(self):
+        """Test result codes outside the table"""
+        result = analyze_downlink_response_complete(build_response(result=0x06))['result']
+
+        self.assertEqual(result['description'], 'Unknown result (0x06)')
+        self.assertEqual(result['error_category'], 'UNKNOWN_ERROR')
+
+    def test_too_short(self):
+        """Test short packets are reported without header fields"""
+        analysis = analyze_downlink_response_complete(build_response()[:12])
+
+        self.assertEqual(analysis['error'], 'Response packet too short')
+        self.assertNotIn('result', analysis)
+
+
+class TestCreateIlluminanceParameterRequest(unittest.TestCase):
+    """Test cases for create_illuminance_parameter_request"""
+
+    def test_layout(self):
+        """Test header and parameter request data"""
+        packet = create_illuminance_parameter_request(0x2468800203400004)
+
+        self.assertEqual(len(packet), 27)
+        version, ptype, data_len, _, device_id, sensor_id, cmd, order = \
+            struct.unpack_from('<BBHLQHBH', packet)
+        self.assertEqual((version, ptype, data_len), (0x01, 0x00, 6))
+        self.assertEqual((device_id, sensor_id, cmd, order), (0x2468800203400004, 0x0121, 0x06, 0x0000))
+        self.assertEqual(packet[21:], bytes.fromhex('00 00 0D FF FF 00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
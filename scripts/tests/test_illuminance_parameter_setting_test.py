@@ -0,0 +1,72 @@
+"""
+Unit tests for illuminance_parameter_setting_test
+
+Checks the GET → MODIFY → SET helpers: parameter uplink parsing, validation
+and serialization to the spec 6-2 DATA format.
+"""
+
+import unittest
+import struct
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from illuminance_parameter_setting_test import (
+    ParameterInfo,
+    parse_parameter_information,
+    update_multiple_parameters,
+    serialize_parameter_structure
+)
+
+
+def build_parameter_uplink() -> bytes:
+    """Build a parameter information uplink (SensorID 0x0000) with 24 bytes of sensor data"""
+    sensor_data = struct.pack('<H3BBBBHLBBff', 0x0121, 1, 2, 3, 9, 1, 4, 100, 60, 0, 1, 1000.0, 10.5)
+    header = struct.pack('<BBHLQH', 0x01, 0x00, len(sensor_data), 1700000000,
+                         0x2468800203400004, 0x0000)
+    return header + b'\x00\x00\x00' + sensor_data
+
+
+class TestParameterSetting(unittest.TestCase):
+    """Test cases for the parameter setting helpers"""
+
+    def test_parse(self):
+        """Test decoded parameter information"""
+        params = parse_parameter_information(build_parameter_uplink())
+
+        self.assertIsInstance(params, ParameterInfo)
+        self.assertEqual(params.sensor_id, 0x0121)
+        self.assertEqual(params.fw_version, '1.2.3')
+        self.assertEqual(params.advertise_interval, 100)
+        self.assertEqual(params.sensor_uplink_interval, 60)
+        self.assertEqual(params.hysteresis_low, 10.5)
+
+    def test_parse_other_sensor(self):
+        """Test rejection of uplinks that are not parameter information"""
+        packet = bytearray(build_parameter_uplink())
+        packet[16:18] = b'\x21\x01'
+        self.assertEqual(parse_parameter_information(bytes(packet)),
+                         {"error": "Not parameter info, sensor ID is 0x0121"})
+
+    def test_update_and_serialize(self):
+        """Test modified parameters serialize to the spec 6-2 layout"""
+        params = parse_parameter_information(build_parameter_uplink())
+        updated = update_multiple_parameters(params, {"sensor_uplink_interval": 10})
+
+        self.assertEqual(params.sensor_uplink_interval, 60)
+        self.assertEqual(serialize_parameter_structure(updated),
+                         struct.pack('<HBBBHLBBff', 0x0121, 9, 1, 4, 100, 10, 0, 1, 1000.0, 10.5))
+
+    def test_invalid_update_applies_nothing(self):
+        """Test a failing update in a batch rejects the whole batch"""
+        params = parse_parameter_information(build_parameter_uplink())
+        with self.assertRaises(ValueError):
+            update_multiple_parameters(params, {"advertise_interval": 200, "sensor_uplink_interval": 0})
+        with self.assertRaises(TypeError):
+            update_multiple_parameters(params, {"hysteresis_high": 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
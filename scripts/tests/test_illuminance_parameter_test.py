@@ -0,0 +1,111 @@
+"""
+Unit tests for illuminance_parameter_test
+
+Checks downlink response parsing and display formatting, and the spec 5-2
+parameter uplink parser.
+"""
+
+import unittest
+import struct
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from illuminance_parameter_test import (
+    DownlinkResponse, parse_downlink_response, format_response, parse_parameter_uplink
+)
+
+DEVICE_ID = 0x2468800203400004
+
+
+def build_response(sensor_id: int = 0x0121, cmd: int = 0x06, result: int = 0x00) -> bytes:
+    """Build a downlink response packet"""
+    return struct.pack('<BBLQHHBB', 0x01, 0x01, 1700000000, DEVICE_ID, sensor_id, 0x0000, cmd, result)
+
+
+def build_parameter_uplink(sensor_id: int = 0x0121) -> bytes:
+    """Build a parameter information uplink packet (header + 28-byte sensor data)"""
+    sensor_data = struct.pack('<HHH3sBBBHLBBff', 0x0000, 0xFFFF, 0x0121, bytes([1, 2, 3]),
+                              9, 1, 4, 100, 60, 0, 1, 1000.0, 10.5)
+    header = struct.pack('<BBHLQH', 0x01, 0x00, len(sensor_data), 1700000000, DEVICE_ID, sensor_id)
+    return header + b'\xC4\x00\x00' + sensor_data
+
+
+class TestParseDownlinkResponse(unittest.TestCase):
+    """Test cases for parse_downlink_response and format_response"""
+
+    def test_fields(self):
+        """Test raw header fields"""
+        response = parse_downlink_response(build_response(result=0x02))
+        self.assertIsInstance(response, DownlinkResponse)
+        self.assertEqual(response.device_id, DEVICE_ID)
+        self.assertEqual(response.sensor_id, 0x0121)
+        self.assertEqual(response.cmd, 0x06)
+        self.assertEqual(response.result, 0x02)
+        self.assertFalse(response.success)
+
+    def test_format(self):
+        """Test display values"""
+        details = format_response(parse_downlink_response(build_response()))
+        self.assertEqual(details["device_id"], "0x2468800203400004")
+        self.assertEqual(details["sensor_name"], "Illuminance")
+        self.assertEqual(details["cmd_name"], "GET_PARAMETER")
+        self.assertEqual(details["result_desc"], "Success")
+        self.assertTrue(details["success"])
+
+    def test_format_unknown_codes(self):
+        """Test display values for unknown sensor, command and result codes"""
+        details = format_response(parse_downlink_response(build_response(0x0122, 0x33, 0x06)))
+        self.assertEqual(details["sensor_name"], "Other(0x0122)")
+        self.assertEqual(details["cmd_name"], "UNKNOWN(0x33)")
+        self.assertEqual(details["result_desc"], "Unknown result (0x06)")
+
+    def test_too_short(self):
+        """Test that short packets give an error dict that formats as itself"""
+        response = parse_downlink_response(b'\x01\x01\x00')
+        self.assertEqual(response, {"error": "Response too short", "raw": b'\x01\x01\x00'})
+        self.assertIs(format_response(response), response)
+
+
+class TestParseParameterUplink(unittest.TestCase):
+    """Test cases for parse_parameter_uplink"""
+
+    def test_values(self):
+        """Test decoded parameter values"""
+        result = parse_parameter_uplink(build_parameter_uplink())
+        self.assertEqual(result["param_sensor_id"], "0x0000")
+        self.assertEqual(result["sequence_no"], 0xFFFF)
+        self.assertEqual(result["connected_sensor_id"], "0x0121")
+        self.assertEqual(result["fw_version"], "1.2.3")
+        self.assertEqual(result["advertise_interval"], 100)
+        self.assertEqual(result["sensor_uplink_interval"], 60)
+        self.assertEqual(result["hysteresis_high"], 1000.0)
+        self.assertEqual(result["hysteresis_low"], 10.5)
+
+    def test_not_illuminance(self):
+        """Test rejection of other sensor IDs"""
+        result = parse_parameter_uplink(build_parameter_uplink(sensor_id=0x0122))
+        self.assertEqual(result, {"error": "Not illuminance sensor"})
+
+    def test_truncated(self):
+        """Test that a truncated uplink yields only the whole fields that fit"""
+        packet = build_parameter_uplink()
+        result = parse_parameter_uplink(packet[:21 + 16])
+        self.assertEqual(list(result)[-1], "advertise_interval")
+        self.assertEqual(result["advertise_interval"], 100)
+        self.assertNotIn("sensor_read_mode", result)
+
+        result = parse_parameter_uplink(packet[:21 + 27])
+        self.assertEqual(result["hysteresis_high"], 1000.0)
+        self.assertNotIn("hysteresis_low", result)
+
+    def test_insufficient_sensor_data(self):
+        """Test rejection of uplinks with fewer than 10 bytes of sensor data"""
+        result = parse_parameter_uplink(build_parameter_uplink()[:30])
+        self.assertEqual(result, {"error": "Insufficient sensor data"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Unit tests for illuminance_uplink_interval_verification
+
+Checks the interval statistics computed from recorded uplink receive times.
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+import illuminance_uplink_interval_verification as verification
+
+
+class TestCalculateStatistics(unittest.TestCase):
+    """Test cases for calculate_statistics"""
+
+    def setUp(self):
+        del verification.uplink_timestamps[:]
+
+    def tearDown(self):
+        del verification.uplink_timestamps[:]
+
+    def record(self, *timestamps):
+        verification.uplink_timestamps.extend(timestamps)
+
+    def test_statistics(self):
+        """Test count, average, minimum, maximum and per-interval values"""
+        self.record(100.0, 110.5, 119.0, 131.0)
+        stats = verification.calculate_statistics()
+
+        self.assertEqual(stats["count"], 3)
+        self.assertAlmostEqual(stats["average"], 31.0 / 3)
+        self.assertEqual(stats["minimum"], 8.5)
+        self.assertEqual(stats["maximum"], 12.0)
+        self.assertEqual(stats["intervals"], [10.5, 8.5, 12.0])
+
+    def test_without_intervals(self):
+        """Test that the per-interval list is omitted on request"""
+        self.record(0.0, 10.0)
+        stats = verification.calculate_statistics(keep_intervals=False)
+
+        self.assertEqual(stats, {"count": 1, "average": 10.0, "minimum": 10.0, "maximum": 10.0})
+
+    def test_without_intervals_matches_full_statistics(self):
+        """Test that the lazy path gives the same statistics as the full one"""
+        self.record(100.0, 110.5, 119.0, 131.0)
+        full = verification.calculate_statistics()
+        lazy = verification.calculate_statistics(keep_intervals=False)
+
+        del full["intervals"]
+        self.assertEqual(lazy.keys(), full.keys())
+        for key in full:
+            self.assertAlmostEqual(lazy[key], full[key])
+
+    def test_insufficient_data(self):
+        """Test that fewer than two uplinks give no statistics"""
+        self.assertIsNone(verification.calculate_statistics())
+        self.record(0.0)
+        self.assertIsNone(verification.calculate_statistics())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Unit tests for temp_jig_info_test
+
+Checks JIG INFO request building, response parsing and display formatting.
+"""
+
+import unittest
+import struct
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from temp_jig_info_test import (
+    JigInfoResponse, create_jig_info_request, parse_jig_info_response, format_response
+)
+
+ROUTER_ID = 0x2468800203400004
+
+
+def build_response(cmd: int, response_data: bytes = b'') -> bytes:
+    """Build a JIG INFO response packet"""
+    return struct.pack('<BBLBQ', 0x01, 0x02, 1700000000, cmd, ROUTER_ID) + response_data
+
+
+class TestCreateJigInfoRequest(unittest.TestCase):
+    """Test cases for create_jig_info_request"""
+
+    def test_request(self):
+        """Test request layout with JST local time"""
+        with patch('temp_jig_info_test.time.time', return_value=1700000000.5):
+            packet = create_jig_info_request(0x02)
+        self.assertEqual(packet, struct.pack('<BBBLL', 0x01, 0x01, 0x02,
+                                             1700000000 + 9 * 3600, 1700000000))
+
+
+class TestParseJigInfoResponse(unittest.TestCase):
+    """Test cases for parse_jig_info_response and format_response"""
+
+    def test_fields(self):
+        """Test raw fields"""
+        response = parse_jig_info_response(build_response(0x02, b'\x01\x02\x03'))
+        self.assertIsInstance(response, JigInfoResponse)
+        self.assertEqual(response.cmd, 0x02)
+        self.assertEqual(response.router_device_id, ROUTER_ID)
+        self.assertEqual(response.response_data, b'\x01\x02\x03')
+
+    def test_format_firmware_version(self):
+        """Test display values of a FW version response"""
+        details = format_response(parse_jig_info_response(build_response(0x02, b'\x01\x02\x03')))
+        self.assertEqual(details["type_name"], "JIG_INFO_RESPONSE")
+        self.assertEqual(details["cmd_name"], "FW_VERSION_GET")
+        self.assertEqual(details["router_device_id"], "0x2468800203400004")
+        self.assertEqual(details["response_data"], "01 02 03")
+        self.assertEqual(details["firmware_version"], "1.2.3")
+
+    def test_format_scan_mode_and_result(self):
+        """Test display values of scan mode and start/stop responses"""
+        details = format_response(parse_jig_info_response(build_response(0x67, b'\x01')))
+        self.assertEqual(details["scan_mode"], "0x01 (Legacy)")
+
+        details = format_response(parse_jig_info_response(build_response(0x00, b'\x00')))
+        self.assertEqual(details["cmd_name"], "STOP")
+        self.assertEqual(details["result"], "Failed")
+
+    def test_format_no_data(self):
+        """Test display values of a response without data"""
+        details = format_response(parse_jig_info_response(build_response(0x33)))
+        self.assertEqual(details["cmd_name"], "UNKNOWN(0x33)")
+        self.assertEqual(details["response_data"], "None")
+        self.assertNotIn("result", details)
+
+    def test_too_short(self):
+        """Test that short packets give an error dict that formats as itself"""
+        response = parse_jig_info_response(b'\x01\x02\x00')
+        self.assertEqual(response, {"error": "Response too short", "raw": b'\x01\x02\x00'})
+        self.assertIs(format_response(response), response)
+
+
+if __name__ == '__main__':
+    unittest.main()